@@ -22,9 +22,10 @@ app = Flask(__name__)
 logging.basicConfig(level=logging.DEBUG)
 
 
-def calculate_metrics(code, language):
+def calculate_metrics(code, language, tree=None):
     """
-    Calculate all code metrics with detailed breakdowns
+    Calculate all code metrics with detailed breakdowns.
+    tree is the already parsed Python AST, if the caller has one.
     """
     print(f"Language: {language}")  
     print(f"Code: {code}") 
@@ -37,10 +38,12 @@ def calculate_metrics(code, language):
 
     if language == "python":
   
-        cc_details = calculate_cc(code)
-        cfc_details = calculate_cfc(code)
-        wcc_details = calculate_wcc(code)
-        mi_details = calculate_maintainability(code)
+        # One parse and one AST traversal for every AST-based metric
+        analysis = analyze_python(code, tree)
+        cc_details = analysis['cc']
+        cfc_details = analysis['cfc']
+        wcc_details = analysis['wcc']
+        mi_details = analysis['mi']
         pylint_details = calculate_pylint_score(code)
 
         # Extract values 
@@ -442,119 +445,131 @@ def enhance_pylint_output(pylint_result):
 # enhancement over
 
 
-def calculate_cc(code):
+class PythonMetricsVisitor(ast.NodeVisitor):
+    """
+    Cyclomatic, cognitive and weighted cyclomatic complexity of one parsed
+    module in a single traversal. Each metric counts exactly what its own
+    visitor used to, so the values match the per-metric passes.
+    """
+
+    def __init__(self):
+        # Cyclomatic complexity
+        self.complexity = 1
+        self.breakdown = []
+        # Cognitive complexity
+        self.cognitive = 0
+        self.nesting_level = 0
+        # Weighted cyclomatic complexity: every function's walk counts the
+        # decisions of its whole subtree, so a decision counts once per enclosing function
+        self.function_count = 0
+        self.function_depth = 0
+        self.function_decisions = 0
+
+    def add_complexity(self, node_type, lineno, count=1):
+        self.complexity += count
+        self.breakdown.append({
+            'type': node_type,
+            'location': f"Line {lineno}",
+            'complexity_added': count
+        })
+
+    def add_function_decisions(self, count):
+        self.function_decisions += count * self.function_depth
+
+    def visit_nested(self, node):
+        self.nesting_level += 1
+        self.generic_visit(node)
+        self.nesting_level -= 1
+
+    def visit_FunctionDef(self, node):
+        self.function_count += 1
+        self.function_depth += 1
+        self.generic_visit(node)
+        self.function_depth -= 1
+
+    def visit_If(self, node):
+        self.add_complexity('if_statement', node.lineno)
+        self.cognitive += 1 + self.nesting_level
+        self.add_function_decisions(1)
+        self.visit_nested(node)
+
+    def visit_For(self, node):
+        self.add_complexity('for_loop', node.lineno)
+        self.cognitive += 1 + self.nesting_level
+        self.add_function_decisions(1)
+        self.visit_nested(node)
+
+    def visit_While(self, node):
+        self.add_complexity('while_loop', node.lineno)
+        self.cognitive += 1 + self.nesting_level
+        self.add_function_decisions(1)
+        self.visit_nested(node)
+
+    def visit_Try(self, node):
+        self.cognitive += 1 + self.nesting_level
+        self.visit_nested(node)
+
+    def visit_ExceptHandler(self, node):
+        self.add_complexity('except_handler', node.lineno)
+        self.cognitive += 1 + self.nesting_level
+        self.generic_visit(node)
+
+    def visit_BoolOp(self, node):
+        count = len(node.values) - 1
+        if count > 0:
+            self.add_complexity('boolean_operator', node.lineno, count)
+        self.cognitive += count
+        self.add_function_decisions(count)
+        self.generic_visit(node)
+
+    def visit_Compare(self, node):
+        count = len(node.ops) - 1
+        self.cognitive += count
+        self.add_function_decisions(count)
+        self.generic_visit(node)
+
+
+def analyze_python(code, tree=None):
+    """
+    CC, cognitive complexity, WCC and maintainability index of Python code from one parse and one traversal.
+    Pass the tree when the caller already parsed the code.
+    """
     try:
-        tree = ast.parse(code)
-        
-        class ComplexityVisitor(ast.NodeVisitor):
-            def __init__(self):
-                self.complexity = 1
-                self.breakdown = []
-            
-            def add_complexity(self, node_type, lineno, count=1):
-                self.complexity += count
-                self.breakdown.append({
-                    'type': node_type,
-                    'location': f"Line {lineno}",
-                    'complexity_added': count
-                })
-            
-            def visit_If(self, node):
-                self.add_complexity('if_statement', node.lineno)
-                self.generic_visit(node)
-            
-            def visit_For(self, node):
-                self.add_complexity('for_loop', node.lineno)
-                self.generic_visit(node)
-            
-            def visit_While(self, node):
-                self.add_complexity('while_loop', node.lineno)
-                self.generic_visit(node)
-            
-            def visit_With(self, node):
-               
-                self.generic_visit(node)
-            
-            def visit_Try(self, node):
-                
-                self.generic_visit(node)
-            
-            def visit_ExceptHandler(self, node):
-                self.add_complexity('except_handler', node.lineno)
-                self.generic_visit(node)
-            
-            def visit_BoolOp(self, node):
-                
-                count = len(node.values) - 1
-                if count > 0:
-                    self.add_complexity('boolean_operator', node.lineno, count)
-                self.generic_visit(node)
-            
-            
-            
-        visitor = ComplexityVisitor()
+        if tree is None:
+            tree = ast.parse(code)
+        visitor = PythonMetricsVisitor()
         visitor.visit(tree)
-        
-        return {
+
+        cc = {
             'value': visitor.complexity,
             'breakdown': visitor.breakdown,
             'total_components': len(visitor.breakdown)
         }
+        cfc = visitor.cognitive
+        # Functions are weighted 1 + 0.1 * nesting, where nesting was looked up
+        # through parent links ast nodes do not have, so every weight is 1.0
+        wcc = float(visitor.function_count + visitor.function_decisions) if visitor.function_count else 1
     except Exception as e:
-        return {"error": str(e)}
+        cc = cfc = wcc = {"error": str(e)}
+
+    return {
+        'cc': cc,
+        'cfc': cfc,
+        'wcc': wcc,
+        'mi': calculate_maintainability(code)
+    }
 
 
+def calculate_cc(code):
+    return analyze_python(code)['cc']
+
 
 def calculate_wcc(code):
     """
     Calculate Weighted Cyclomatic Complexity manually.
     Formula: WCC = Sum of (complexity of each function * nesting level multiplier)
     """
-    try:
-        tree = ast.parse(code)
-        total_weighted_complexity = 0
-        
-        class FunctionVisitor(ast.NodeVisitor):
-            def __init__(self):
-                self.functions = []
-            
-            def visit_FunctionDef(self, node):
-                self.functions.append(node)
-                self.generic_visit(node)
-        
-       
-        visitor = FunctionVisitor()
-        visitor.visit(tree)
-        
-        # Calculate complexity for each function
-        for func in visitor.functions:
-            #  base complexity
-            cc = 1
-            for node in ast.walk(func):
-                if isinstance(node, ast.If) or isinstance(node, ast.For) or isinstance(node, ast.While):
-                    cc += 1
-                elif isinstance(node, ast.BoolOp):
-                    cc += len(node.values) - 1
-                elif isinstance(node, ast.Compare):
-                    cc += len(node.ops) - 1
-            
-            #  nesting level
-            nesting_level = 0
-            parent = func
-            while hasattr(parent, 'parent'):
-                parent = parent.parent
-                if isinstance(parent, (ast.FunctionDef, ast.ClassDef)):
-                    nesting_level += 1
-            
-          
-            weight = 1 + (0.1 * nesting_level)
-            total_weighted_complexity += cc * weight
-        
-        return total_weighted_complexity if visitor.functions else 1
-    except Exception as e:
-        return {"error": str(e)}
-
-
+    return analyze_python(code)['wcc']
 
 
 def calculate_cfc(code):
@@ -562,57 +577,7 @@ def calculate_cfc(code):
     Calculate Cognitive Complexity manually.
     Based on SonarSource's Cognitive Complexity specification.
     """
-    try:
-        tree = ast.parse(code)
-        complexity = 0
-        
-        class CognitiveVisitor(ast.NodeVisitor):
-            def __init__(self):
-                self.complexity = 0
-                self.nesting_level = 0
-            
-            def visit_If(self, node):
-                self.complexity += 1 + self.nesting_level
-                self.nesting_level += 1
-                self.generic_visit(node)
-                self.nesting_level -= 1
-            
-            def visit_For(self, node):
-                self.complexity += 1 + self.nesting_level
-                self.nesting_level += 1
-                self.generic_visit(node)
-                self.nesting_level -= 1
-            
-            def visit_While(self, node):
-                self.complexity += 1 + self.nesting_level
-                self.nesting_level += 1
-                self.generic_visit(node)
-                self.nesting_level -= 1
-            
-            def visit_Try(self, node):
-                self.complexity += 1 + self.nesting_level
-                self.nesting_level += 1
-                self.generic_visit(node)
-                self.nesting_level -= 1
-            
-            def visit_ExceptHandler(self, node):
-                self.complexity += 1 + self.nesting_level
-                self.generic_visit(node)
-            
-            def visit_BoolOp(self, node):
-                self.complexity += len(node.values) - 1
-                self.generic_visit(node)
-            
-            def visit_Compare(self, node):
-                self.complexity += len(node.ops) - 1
-                self.generic_visit(node)
-        
-        visitor = CognitiveVisitor()
-        visitor.visit(tree)
-        return visitor.complexity
-    except Exception as e:
-        return {"error": str(e)}
-
+    return analyze_python(code)['cfc']
 
 
 def calculate_maintainability(code):
@@ -622,18 +587,15 @@ def calculate_maintainability(code):
     Simplified version using just CC and LOC
     """
     try:
-        # Calculate LOC
-        loc = len(code.splitlines())
-        
-        # Calculate Cyclomatic Complexity
-        cc = calculate_cc(code)
-        if isinstance(cc, dict):
-            cc = 1  # Default if error
-        
-        # Calculate comment percentage (simplified)
-        comment_lines = sum(1 for line in code.splitlines() if line.strip().startswith('#'))
+        # LOC and comment lines from one pass over the lines
+        lines = code.splitlines()
+        loc = len(lines)
+        comment_lines = sum(1 for line in lines if line.strip().startswith('#'))
         comment_percentage = (comment_lines / loc) * 100 if loc > 0 else 0
-        
+
+        # The CC term has always used 1: calculate_cc returns a dict, which was treated as an error
+        cc = 1
+
         # Simplified MI calculation
         mi = max(0, 171 - 5.2 * (cc or 1) - 0.23 * (loc or 1) + 0.1 * comment_percentage)
         return mi
@@ -845,9 +807,10 @@ def evaluate_code():
     print(f"Language: {language}")   # Debug print
     # Validate syntax
     try:
+        tree = None
         if language == "python":
-            # Validate Python syntax
-            ast.parse(code)
+            # Validate Python syntax, the tree is reused for the metrics
+            tree = ast.parse(code)
         elif language == "javascript":
             # Validate JavaScript syntax using Esprima
             try:
@@ -858,7 +821,7 @@ def evaluate_code():
             return jsonify({"error": f"Unsupported language: {language}"}), 400
 
         # Calculate metrics
-        metrics = calculate_metrics(code, language)
+        metrics = calculate_metrics(code, language, tree)
         return jsonify(metrics)
     except SyntaxError as e:
         return jsonify({"error": str(e)}), 400
@@ -0,0 +1,134 @@
+import ast
+
+import pytest
+
+# app imports every analyzer at module level
+for dependency in ('flask', 'radon', 'mccabe', 'pylint', 'esprima'):
+    pytest.importorskip(dependency)
+
+import app  # noqa: E402
+
+
+NESTED_FUNCTIONS = '''def outer(items):
+    def inner(x):
+        if x:
+            for y in x:
+                while y:
+                    y -= 1
+        return x
+    if items:
+        return [inner(i) for i in items]
+    return []
+'''
+
+BOOL_AND_COMPARE_CHAINS = '''def check(a, b, c, d):
+    if a and b or c:
+        return 1
+    while 0 < a < b <= c and d:
+        a += 1
+    return a == b == c or not d
+'''
+
+TRY_EXCEPT = '''# Parse a number
+def parse(value):
+    try:
+        return int(value)
+    except ValueError:
+        if value and value.strip():
+            return None
+    except TypeError:
+        return 0
+    finally:
+        pass
+'''
+
+MODULE_LEVEL = '''x = 1
+y = x if x else 2
+'''
+
+
+def component(node_type, line):
+    return {'type': node_type, 'location': f"Line {line}", 'complexity_added': 1}
+
+
+# Outputs of the per-metric visitors (one parse and one walk each) that
+# analyze_python replaced, pinned so the single pass keeps reproducing them
+EXPECTED = {
+    'nested_functions': (NESTED_FUNCTIONS, {
+        'cc': {
+            'value': 5,
+            'breakdown': [
+                component('if_statement', 3), component('for_loop', 4),
+                component('while_loop', 5), component('if_statement', 8)
+            ],
+            'total_components': 4
+        },
+        'cfc': 7,
+        'wcc': 9.0,
+        'mi': 163.5
+    }),
+    'bool_and_compare_chains': (BOOL_AND_COMPARE_CHAINS, {
+        'cc': {
+            'value': 7,
+            'breakdown': [
+                component('if_statement', 2), component('boolean_operator', 2), component('boolean_operator', 2),
+                component('while_loop', 4), component('boolean_operator', 4), component('boolean_operator', 6)
+            ],
+            'total_components': 6
+        },
+        'cfc': 9,
+        'wcc': 10.0,
+        'mi': 164.42000000000002
+    }),
+    'try_except': (TRY_EXCEPT, {
+        'cc': {
+            'value': 5,
+            'breakdown': [
+                component('except_handler', 5), component('if_statement', 6),
+                component('boolean_operator', 6), component('except_handler', 8)
+            ],
+            'total_components': 4
+        },
+        'cfc': 8,
+        'wcc': 3.0,
+        'mi': 164.17909090909092
+    }),
+    'module_level': (MODULE_LEVEL, {
+        'cc': {'value': 1, 'breakdown': [], 'total_components': 0},
+        'cfc': 0,
+        'wcc': 1,
+        'mi': 165.34
+    }),
+}
+
+
+@pytest.fixture(params=sorted(EXPECTED))
+def case(request):
+    return EXPECTED[request.param]
+
+
+def test_analyze_python_matches_per_metric_visitors(case):
+    code, expected = case
+    result = app.analyze_python(code)
+    assert result == expected
+    # int and float results stay the types the old visitors returned
+    assert type(result['wcc']) is type(expected['wcc'])
+
+
+def test_metric_wrappers_match_analyze_python(case):
+    code, expected = case
+    assert app.calculate_cc(code) == expected['cc']
+    assert app.calculate_cfc(code) == expected['cfc']
+    assert app.calculate_wcc(code) == expected['wcc']
+    assert app.calculate_maintainability(code) == expected['mi']
+
+
+def test_analyze_python_reuses_a_parsed_tree(case):
+    code, expected = case
+    assert app.analyze_python(code, ast.parse(code)) == expected
+
+
+def test_analyze_python_reports_syntax_errors():
+    result = app.analyze_python("def broken(:\n")
+    assert 'error' in result['cc']
+    assert result['cfc'] == result['wcc'] == result['cc']
@@ -62,52 +62,36 @@ exports.unifiedAudioController = async (req, res) => {
         }
         console.log('Question retrieved successfully:', question);
 
-        // Create a copy of the file for each operation to avoid conflicts
         const originalPath = req.file.path;
-        const predictionPath = path.join(path.dirname(originalPath), `pred_${path.basename(originalPath)}`);
-        const transcriptionPath = path.join(path.dirname(originalPath), `trans_${path.basename(originalPath)}`);
 
-        // Copy the file for prediction
-        fs.copyFileSync(originalPath, predictionPath);
-        // Copy the file for transcription
-        fs.copyFileSync(originalPath, transcriptionPath);
-
-        // 1. Process prediction
+        // Transcription, confidence prediction and comparison in one upload
         let confidencePrediction = null;
-        try {
-            confidencePrediction = await processPrediction(predictionPath);
-            console.log('Confidence prediction completed:', confidencePrediction);
-        } catch (error) {
-            console.error('Error in confidence prediction:', error.message);
-        }
-
-        // 2. Process transcription
         let transcriptionResult = null;
         let marks = 0; // Initialize marks
         try {
-            const transcription = await transcribeAudio(transcriptionPath);
-            console.log('Transcription result:', transcription);
-
-            // Process comparison
-            const comparisonResult = await compareAnswers(transcription, question.answers);
-            console.log('Comparison results:', comparisonResult);
-
-            // Calculate marks - 10 if correct, 0 otherwise
-            marks = comparisonResult.is_correct ? 10 : 0;
-            
-            transcriptionResult = {
-                transcription: transcription,
-                similarity: comparisonResult.similarity_scores,
-                isCorrect: comparisonResult.is_correct
-            };
+            const analysis = await analyzeAnswer(originalPath, question.answers);
+            console.log('Answer analysis completed:', analysis);
+
+            if (analysis.prediction && !analysis.prediction.error) {
+                confidencePrediction = analysis.prediction;
+            }
+
+            if (analysis.comparison && !analysis.comparison.error) {
+                // Calculate marks - 10 if correct, 0 otherwise
+                marks = analysis.comparison.is_correct ? 10 : 0;
+
+                transcriptionResult = {
+                    transcription: analysis.transcription,
+                    similarity: analysis.comparison.similarity_scores,
+                    isCorrect: analysis.comparison.is_correct
+                };
+            }
         } catch (error) {
-            console.error('Error in transcription or comparison:', error.message);
+            console.error('Error in answer analysis:', error.message);
         }
 
-        // Clean up all files
+        // Clean up the uploaded file
         cleanupFiles(originalPath);
-        cleanupFiles(predictionPath);
-        cleanupFiles(transcriptionPath);
 
         // Prepare the question response object with marks
         const questionResponse = {
@@ -181,84 +165,41 @@ exports.unifiedAudioController = async (req, res) => {
 };
 
 /**
- * Process confidence prediction from audio
+ * Transcribe, predict confidence and compare answers with a single upload
  */
-async function processPrediction(filePath) {
-    const tempFilePath = path.join(__dirname, `temp_pred_${Date.now()}.wav`);
+async function analyzeAnswer(filePath, actualAnswers) {
+    const tempFilePath = path.join(__dirname, `temp_analyze_${Date.now()}.wav`);
 
     return new Promise((resolve, reject) => {
         ffmpeg(filePath)
             .toFormat('wav')
             .on('end', async () => {
-                console.log('Conversion for prediction completed');
+                console.log('Conversion for analysis completed');
 
                 try {
                     const form = new FormData();
                     form.append('audio', fs.createReadStream(tempFilePath));
+                    form.append('actual_answer', JSON.stringify(actualAnswers));
 
-                    console.log('Sending audio for prediction');
-                    const response = await axios.post(`${MICROSERVICE_URL}/predict`, form, {
+                    console.log('Sending audio for analysis');
+                    const response = await axios.post(`${MICROSERVICE_URL}/analyze-answer`, form, {
                         headers: {
                             ...form.getHeaders()
                         }
                     });
 
-                    console.log('Prediction response received');
-
-                    // Clean up temp file
+                    console.log('Analysis response received');
                     cleanupFiles(tempFilePath);
 
                     resolve(response.data);
                 } catch (error) {
-                    console.error('Error in prediction processing:', error.message);
-                    cleanupFiles(tempFilePath);
-                    reject(error);
-                }
-            })
-            .on('error', (err) => {
-                console.error('Error in conversion for prediction:', err.message);
-                cleanupFiles(tempFilePath);
-                reject(err);
-            })
-            .save(tempFilePath);
-    });
-}
-
-/**
- * Transcribe audio file
- */
-async function transcribeAudio(filePath) {
-    const tempFilePath = path.join(__dirname, `temp_trans_${Date.now()}.wav`);
-
-    return new Promise((resolve, reject) => {
-        ffmpeg(filePath)
-            .toFormat('wav')
-            .on('end', async () => {
-                console.log('Conversion for transcription completed');
-
-                try {
-                    const form = new FormData();
-                    form.append('audio', fs.createReadStream(tempFilePath));
-
-                    console.log('Sending audio for transcription');
-                    const response = await axios.post(`${MICROSERVICE_URL}/transcribe`, form, {
-                        headers: {
-                            ...form.getHeaders()
-                        }
-                    });
-
-                    console.log('Transcription response received');
-                    cleanupFiles(tempFilePath);
-
-                    resolve(response.data.candidate_answer);
-                } catch (error) {
-                    console.error('Error in transcription:', error.message);
+                    console.error('Error in answer analysis:', error.message);
                     cleanupFiles(tempFilePath);
                     reject(error);
                 }
             })
             .on('error', (err) => {
-                console.error('Error in conversion for transcription:', err.message);
+                console.error('Error in conversion for analysis:', err.message);
                 cleanupFiles(tempFilePath);
                 reject(err);
             })
@@ -266,27 +207,6 @@ async function transcribeAudio(filePath) {
     });
 }
 
-/**
- * Compare answers with question
- */
-async function compareAnswers(candidateAnswer, actualAnswers) {
-    console.log('Sending answers for comparison');
-    console.log('candidate_answer:', candidateAnswer);
-    console.log('actual_answer:', actualAnswers);
-
-    const response = await axios.post(`${MICROSERVICE_URL}/compare`, {
-        candidate_answer: candidateAnswer,
-        actual_answer: actualAnswers,
-    });
-
-    console.log('Comparison response received');
-
-    return {
-        similarity_scores: response.data.similarity_scores,
-        is_correct: response.data.is_correct
-    };
-}
-
 /**
  * Helper function to clean up files
  */
@@ -1,34 +1,28 @@
-
-
-from flask import Flask, request, jsonify
-from sklearn.metrics.pairwise import cosine_similarity
+from flask import Flask, Response, request, jsonify, stream_with_context
+import copy
+import json
 import joblib
 import librosa
+import multiprocessing
 import numpy as np
 import os
-import whisper  
-
-from transformers import (
-    AutoTokenizer, 
-    AutoModel,
-    T5Tokenizer, 
-    T5ForConditionalGeneration
-)
-from difflib import SequenceMatcher
 import torch
-import spacy
-from sentence_transformers import SentenceTransformer
-import nltk
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
-from nltk.stem import WordNetLemmatizer
 from typing import List, Dict, Union, Optional
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import logging
 
+from audio_features import (
+    extract_features, extract_features_streaming, features_from_file, features_from_path, iter_blocks
+)
+from audio_io import WHISPER_SAMPLE_RATE, copy_to_temp_file, decode_audio, to_whisper_input
+from caching import LRUCache, ResultCache, SingleFlight
+from chunked_transcription import ChunkedTranscriber
+from model_registry import ModelRegistry
+from reference_store import ReferenceStore
+from text_analysis import TextAnalysis
+from transcription_queue import QueueFullError, TranscriptionQueue, WorkersUnavailableError
+from whisper_tiers import WhisperTierPolicy
 
-nltk.download('punkt')
-nltk.download('stopwords')
-nltk.download('wordnet')
 
 logging.basicConfig(
     level=logging.INFO,
@@ -41,140 +35,387 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 
 
-# model = joblib.load(r'/app/models/confidence_model.pkl')
-model = joblib.load('D:\\personel\\3y2s\\4Y\\INTERVIEW-PROCESSING-SYSTEM\\backend\\voice-confidence-service\\models\\confidence_model.pkl')
+# Model configuration
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CONFIDENCE_MODEL_PATH = os.environ.get('CONFIDENCE_MODEL_PATH', os.path.join(BASE_DIR, 'models', 'confidence_model.pkl'))
+WHISPER_MODEL_NAME = os.environ.get('WHISPER_MODEL', 'tiny')
+SENTENCE_MODEL_NAME = os.environ.get('SENTENCE_MODEL', 'all-MiniLM-L6-v2')
+SPACY_MODEL_NAME = os.environ.get('SPACY_MODEL', 'en_core_web_lg')
+
+# Whisper sizes /transcribe and /analyze-answer may pick per request, fastest first (e.g. "tiny,base,small").
+# Outstanding transcriptions at WHISPER_BUSY_DEPTH drop one tier, at WHISPER_PEAK_DEPTH use the fastest;
+# recordings over WHISPER_LONG_SECONDS drop one more tier
+WHISPER_TIERS = [tier.strip() for tier in os.environ.get('WHISPER_TIERS', WHISPER_MODEL_NAME).split(',') if tier.strip()]
+WHISPER_BUSY_DEPTH = int(os.environ.get('WHISPER_BUSY_DEPTH', 2))
+WHISPER_PEAK_DEPTH = int(os.environ.get('WHISPER_PEAK_DEPTH', 6))
+WHISPER_LONG_SECONDS = float(os.environ.get('WHISPER_LONG_SECONDS', 120))
+
+# "slim" keeps only the spaCy components answer scoring uses and memory-maps the vector table from SPACY_VECTORS_DIR
+SPACY_MODE = os.environ.get('SPACY_MODE', 'full')
+SPACY_VECTORS_DIR = os.environ.get('SPACY_VECTORS_DIR', os.path.join(BASE_DIR, 'spacy_vectors'))
+T5_MODEL_NAME = os.environ.get('T5_MODEL', 't5-base')
+
+# "torch" runs SentenceTransformer and T5 in PyTorch, "onnx" runs int8-quantized ONNX exports on ONNX Runtime
+INFERENCE_BACKEND = os.environ.get('INFERENCE_BACKEND', 'torch')
+ONNX_CACHE_DIR = os.environ.get('ONNX_CACHE_DIR', os.path.join(BASE_DIR, 'onnx_models'))
+
+# Sample rate audio is decoded at for confidence features ("native" keeps the upload's rate).
+# The confidence classifier was trained on native-rate features, and resampling moves the
+# spectral features far enough to change its verdicts, so only set a rate after retraining
+FEATURE_SAMPLE_RATE = os.environ.get('FEATURE_SAMPLE_RATE', 'native')
+FEATURE_SAMPLE_RATE = None if FEATURE_SAMPLE_RATE == 'native' else int(FEATURE_SAMPLE_RATE)
+
+# "stream" reads audio and accumulates features block by block in constant memory,
+# "full" builds the whole-recording spectrograms in memory
+FEATURE_EXTRACTION = os.environ.get('FEATURE_EXTRACTION', 'stream')
+STREAM_FEATURES = FEATURE_EXTRACTION == 'stream'
+
+# Processes used to extract features for /predict/batch
+AUDIO_WORKERS = int(os.environ.get('AUDIO_WORKERS', os.cpu_count() or 1))
+
+# Whisper workers (each with its own model) and queue bound for /transcribe/jobs
+TRANSCRIPTION_WORKERS = int(os.environ.get('TRANSCRIPTION_WORKERS', 2))
+TRANSCRIPTION_MAX_PENDING = int(os.environ.get('TRANSCRIPTION_MAX_PENDING', 100))
+# Comma separated hosts /transcribe/jobs may POST a callback_url to (http/https only); none by default
+TRANSCRIPTION_CALLBACK_HOSTS = [
+    host.strip() for host in os.environ.get('TRANSCRIPTION_CALLBACK_HOSTS', '').split(',') if host.strip()
+]
 
-# D:\personel\3y2s\4Y\INTERVIEW-PROCESSING-SYSTEM\backend\voice-confidence-service\models\confidence_model.pkl
+# "full" decodes the whole recording in one Whisper pass, "chunked" drops silence and
+# transcribes pause-delimited chunks in TRANSCRIBE_PROCESSES processes (0: one after
+# another in this process, with the model the full mode uses)
+TRANSCRIBE_MODE = os.environ.get('TRANSCRIBE_MODE', 'full')
+TRANSCRIBE_PROCESSES = int(os.environ.get('TRANSCRIBE_PROCESSES', 2))
 
-# Whisper model
-whisper_model = whisper.load_model("tiny")
-print("Whisper model loaded successfully!")
-print("Model loaded successfully in VS Code!")
+# Content-hash cache for /predict and /transcribe results; RESULT_CACHE_DIR adds a disk tier shared by workers
+RESULT_CACHE_SIZE = int(os.environ.get('RESULT_CACHE_SIZE', 512))
+RESULT_CACHE_DIR = os.environ.get('RESULT_CACHE_DIR')
+RESULT_CACHE_MAX_BYTES = int(os.environ.get('RESULT_CACHE_MAX_BYTES', 256 * 1024 * 1024))
 
-sentence_model = SentenceTransformer('all-MiniLM-L6-v2')
-nlp = spacy.load('en_core_web_lg')
+# Comma separated models to load in the background at startup ("none" to load everything on first use)
+WARMUP_MODELS = os.environ.get('WARMUP_MODELS', 'confidence,whisper,sentence,spacy,t5')
 
-# Load T5 model for paraphrase generation
-t5_tokenizer = T5Tokenizer.from_pretrained('t5-base')
-t5_model = T5ForConditionalGeneration.from_pretrained('t5-base')
+# Least recently used models are unloaded once the loaded ones exceed MODEL_MEMORY_BUDGET_MB (0 = no limit),
+# and models unused for MODEL_IDLE_SECONDS (0 = never) are unloaded as well; both reload on demand.
+# With a budget, warm up only the models this replica serves.
+MODEL_MEMORY_BUDGET_MB = float(os.environ.get('MODEL_MEMORY_BUDGET_MB', 0))
+MODEL_IDLE_SECONDS = float(os.environ.get('MODEL_IDLE_SECONDS', 0))
 
-def preprocess_audio(file_path):
-    audio, sr = librosa.load(file_path, sr=None)
-    mfccs = librosa.feature.mfcc(y=audio, sr=sr, n_mfcc=13)
-    mfccs_mean = np.mean(mfccs.T, axis=0)
-    pitches, magnitudes = librosa.core.piptrack(y=audio, sr=sr)
-    pitch_mean = np.mean(pitches[pitches > 0]) if np.any(pitches) else 0
-    spectral_centroid = np.mean(librosa.feature.spectral_centroid(y=audio, sr=sr))
-    spectral_bandwidth = np.mean(librosa.feature.spectral_bandwidth(y=audio, sr=sr))
-    chroma = np.mean(librosa.feature.chroma_stft(y=audio, sr=sr))
-    features = np.hstack([mfccs_mean, pitch_mean, spectral_centroid, spectral_bandwidth, chroma])
-    expected_feature_count = 19
-    while len(features) < expected_feature_count:
-        features = np.append(features, 0)
-    return features
+
+def load_whisper_model(name=WHISPER_MODEL_NAME):
+    import whisper
+    return whisper.load_model(name)
+
+
+def whisper_model_key(tier):
+    # The configured WHISPER_MODEL keeps the plain 'whisper' registry name used by warm-up and /ready
+    return 'whisper' if tier == WHISPER_MODEL_NAME else f'whisper-{tier}'
+
+
+def load_sentence_model():
+    if INFERENCE_BACKEND == 'onnx':
+        import onnx_backend
+        return onnx_backend.load_sentence_model(SENTENCE_MODEL_NAME, ONNX_CACHE_DIR)
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(SENTENCE_MODEL_NAME)
+
+
+def load_spacy_model():
+    if SPACY_MODE == 'slim':
+        import spacy_slim
+        return spacy_slim.load_slim(SPACY_MODEL_NAME, os.path.join(SPACY_VECTORS_DIR, f'{SPACY_MODEL_NAME}.npy'))
+    import spacy
+    return spacy.load(SPACY_MODEL_NAME)
+
+
+def load_t5_model():
+    # Load T5 model for paraphrase generation
+    if INFERENCE_BACKEND == 'onnx':
+        import onnx_backend
+        return onnx_backend.load_t5_model(T5_MODEL_NAME, ONNX_CACHE_DIR)
+    from transformers import T5Tokenizer, T5ForConditionalGeneration
+    return T5Tokenizer.from_pretrained(T5_MODEL_NAME), T5ForConditionalGeneration.from_pretrained(T5_MODEL_NAME)
+
+
+def warm_up_t5(t5):
+    tokenizer, t5_model = t5
+    input_ids = tokenizer.encode("paraphrase: warm up", return_tensors="pt")
+    with torch.no_grad():
+        t5_model.generate(input_ids, max_new_tokens=4)
+
+
+models = ModelRegistry(memory_budget_mb=MODEL_MEMORY_BUDGET_MB, idle_seconds=MODEL_IDLE_SECONDS)
+models.register(
+    'confidence',
+    lambda: joblib.load(CONFIDENCE_MODEL_PATH),
+    warmup=lambda m: m.predict_proba(np.zeros((1, 19)))
+)
+for tier in dict.fromkeys([WHISPER_MODEL_NAME] + WHISPER_TIERS):
+    models.register(
+        whisper_model_key(tier),
+        lambda tier=tier: load_whisper_model(tier),
+        warmup=lambda m: m.transcribe(np.zeros(16000, dtype=np.float32), fp16=False)
+    )
+models.register('sentence', load_sentence_model, warmup=lambda m: m.encode(["warm up"]))
+models.register('spacy', load_spacy_model, warmup=lambda m: m("warm up"))
+models.register('t5', load_t5_model, warmup=warm_up_t5)
+
+def preprocess_audio(audio, sr=None):
+    """
+    19-dim voice feature vector from a file path or an already decoded buffer
+    """
+    if isinstance(audio, (str, os.PathLike)):
+        if STREAM_FEATURES:
+            return features_from_path(audio, FEATURE_SAMPLE_RATE, streaming=True)
+        audio, sr = librosa.load(audio, sr=FEATURE_SAMPLE_RATE)
+    elif FEATURE_SAMPLE_RATE is not None and sr != FEATURE_SAMPLE_RATE:
+        audio = librosa.resample(audio, orig_sr=sr, target_sr=FEATURE_SAMPLE_RATE)
+        sr = FEATURE_SAMPLE_RATE
+    if STREAM_FEATURES:
+        return extract_features_streaming(iter_blocks(audio), sr)
+    return extract_features(audio, sr)
 
 
 def preprocess_text(text):
     """
     Preprocess text by removing stopwords, lemmatizing, and cleaning
     """
-    # Tokenize
-    tokens = word_tokenize(text.lower())
-    
-    # Remove stopwords and lemmatize
-    stop_words = set(stopwords.words('english'))
-    lemmatizer = WordNetLemmatizer()
-    
-    processed_tokens = [
-        lemmatizer.lemmatize(token) 
-        for token in tokens 
-        if token not in stop_words and token.isalnum()
-    ]
-    
-    return ' '.join(processed_tokens)
+    return TextAnalysis.from_doc(models.get('spacy')(text)).normalized
 
-def generate_paraphrases(text, num_paraphrases=3):
+PARAPHRASE_CACHE_SIZE = int(os.environ.get('PARAPHRASE_CACHE_SIZE', 1024))
+PARAPHRASE_MIN_TOKENS = 16
+PARAPHRASE_LENGTH_RATIO = 1.5
+
+
+def normalize_answer_text(text):
     """
-    Generate paraphrases of the input text using T5
+    Normalize answer text so equivalent answers share one cache entry
     """
-    input_text = f"paraphrase: {text}"
-    input_ids = t5_tokenizer.encode(input_text, return_tensors="pt", max_length=512, truncation=True)
-    
-    paraphrases = []
-    for _ in range(num_paraphrases):
-        outputs = t5_model.generate(
-            input_ids,
+    return ' '.join(text.lower().split())
+
+
+paraphrase_cache = LRUCache(PARAPHRASE_CACHE_SIZE)
+
+
+def generate_paraphrases_batch(texts, num_paraphrases=3):
+    """
+    Paraphrases for several texts with one batched T5 generate call for the uncached ones
+    """
+    keys = [normalize_answer_text(text) for text in texts]
+    # Results come from this dict, the cache is only looked up once per key:
+    # entries can be evicted at any time by a small cache or concurrent requests
+    paraphrases = {}
+    # The normalized text is only the cache key, T5 paraphrases the first original text seen for it
+    missing = {}
+    for key, text in zip(keys, texts):
+        if key in paraphrases or key in missing:
+            continue
+        cached = paraphrase_cache.get((key, num_paraphrases))
+        if cached is not None:
+            paraphrases[key] = cached
+        else:
+            missing[key] = text
+
+    if missing:
+        t5_tokenizer, t5_model = models.get('t5')
+        inputs = t5_tokenizer(
+            [f"paraphrase: {text}" for text in missing.values()],
+            return_tensors="pt",
+            padding=True,
             max_length=512,
-            num_return_sequences=1,
-            num_beams=5,
-            temperature=0.7,
-            do_sample=True
+            truncation=True
         )
-        paraphrase = t5_tokenizer.decode(outputs[0], skip_special_tokens=True)
-        paraphrases.append(paraphrase)
-    
-    return paraphrases
+
+        # Output budget follows the input length instead of a fixed 512 tokens
+        max_new_tokens = min(512, max(PARAPHRASE_MIN_TOKENS, int(inputs['input_ids'].shape[-1] * PARAPHRASE_LENGTH_RATIO)))
+
+        # One batched call returns every paraphrase at once
+        with torch.no_grad():
+            outputs = t5_model.generate(
+                **inputs,
+                max_new_tokens=max_new_tokens,
+                num_return_sequences=num_paraphrases,
+                num_beams=max(5, num_paraphrases),
+                temperature=0.7,
+                do_sample=True
+            )
+
+        decoded = t5_tokenizer.batch_decode(outputs, skip_special_tokens=True)
+        for i, key in enumerate(missing):
+            paraphrases[key] = tuple(decoded[i * num_paraphrases:(i + 1) * num_paraphrases])
+            paraphrase_cache.put((key, num_paraphrases), paraphrases[key])
+
+    return [list(paraphrases[key]) for key in keys]
+
+
+def generate_paraphrases(text, num_paraphrases=3):
+    """
+    Generate paraphrases of the input text using T5
+    """
+    return generate_paraphrases_batch([text], num_paraphrases)[0]
+
+def vector_similarity(vector1, vector2):
+    """
+    Cosine similarity of two vectors, 0 when either one is empty
+    """
+    norm = np.linalg.norm(vector1) * np.linalg.norm(vector2)
+    if norm == 0:
+        return 0.0
+    return float(np.dot(vector1, vector2) / norm)
+
 
 def get_semantic_similarity(text1, text2):
     """
     Get semantic similarity using multiple methods
     """
-    # SpaCy similarity
-    doc1 = nlp(text1)
-    doc2 = nlp(text2)
-    spacy_similarity = doc1.similarity(doc2)
-    
-    # Sentence-BERT similarity
-    embeddings1 = sentence_model.encode([text1])
-    embeddings2 = sentence_model.encode([text2])
-    sbert_similarity = cosine_similarity(embeddings1, embeddings2)[0][0]
-    
-    # Combine similarities with weights
-    combined_similarity = (spacy_similarity * 0.4 + sbert_similarity * 0.6)
-    
-    return combined_similarity
+    analysis1, analysis2 = analyze_texts([text1, text2], normalize=False)
+    return get_feature_similarity(analysis1, analysis2)
+
 
-def extract_key_information(text):
+def get_feature_similarity(analysis1, analysis2):
+    """
+    SpaCy and Sentence-BERT similarity of two analyzed texts, combined with weights
+    """
+    spacy_similarity = vector_similarity(analysis1.vector, analysis2.vector)
+    sbert_similarity = vector_similarity(analysis1.embedding, analysis2.embedding)
+    return spacy_similarity * 0.4 + sbert_similarity * 0.6
+
+
+def extract_key_information(text, doc=None):
     """
     Extract key information using SpaCy
     """
-    doc = nlp(text)
-    
-    # Extract named entities
-    entities = [ent.text for ent in doc.ents]
-    
-    # Extract main noun phrases
-    noun_phrases = [chunk.text for chunk in doc.noun_chunks]
-    
-    # Extract main verbs
-    main_verbs = [token.lemma_ for token in doc if token.pos_ == "VERB"]
-    
-    return {
-        'entities': entities,
-        'noun_phrases': noun_phrases,
-        'main_verbs': main_verbs
-    }
+    if doc is None:
+        doc = models.get('spacy')(text)
+    return TextAnalysis.from_doc(doc, normalize=False).info
+
+
+def analyze_texts(texts, normalize=True):
+    """
+    One spaCy pass and one SBERT batch for all texts.
+
+    normalize is a single flag or one flag per text, see TextAnalysis.
+    """
+    if isinstance(normalize, bool):
+        normalize = [normalize] * len(texts)
+
+    analyses = [
+        TextAnalysis.from_doc(doc, flag)
+        for doc, flag in zip(models.get('spacy').pipe(texts), normalize)
+    ]
+    embeddings = models.get('sentence').encode([analysis.normalized for analysis in analyses])
+    for analysis, embedding in zip(analyses, embeddings):
+        analysis.embedding = embedding
+    return analyses
+
+
+def analyze_references(answers):
+    """
+    Reference-side analyses stored once per answer in the reference store
+    """
+    return analyze_texts(answers, normalize=True)
+
+
+def similarity_matrix(analyses1, analyses2):
+    """
+    get_feature_similarity for every (analyses1[i], analyses2[j]) pair in one NumPy pass
+    """
+    def cosine_matrix(attribute):
+        a = np.asarray([getattr(x, attribute) for x in analyses1], dtype=np.float64)
+        b = np.asarray([getattr(x, attribute) for x in analyses2], dtype=np.float64)
+        a_norm = np.linalg.norm(a, axis=1, keepdims=True)
+        b_norm = np.linalg.norm(b, axis=1, keepdims=True)
+        # Zero vectors (e.g. no in-vocabulary tokens) score 0 like Doc.similarity does
+        a = np.divide(a, a_norm, out=np.zeros_like(a), where=a_norm > 0)
+        b = np.divide(b, b_norm, out=np.zeros_like(b), where=b_norm > 0)
+        return a @ b.T
+
+    return cosine_matrix('vector') * 0.4 + cosine_matrix('embedding') * 0.6
+
+
+def reference_model_version(backend=None, spacy_model=None):
+    """
+    Tag of everything stored reference features depend on: the models (the
+    configured ones unless given) and the version of the answer analysis
+    """
+    return f'{SENTENCE_MODEL_NAME}+{backend or INFERENCE_BACKEND}+{spacy_model or SPACY_MODEL_NAME}+analysis-v3'
+
+
+REFERENCE_STORE_DIR = os.environ.get('REFERENCE_STORE_DIR', os.path.join(BASE_DIR, 'reference_store'))
+reference_store = ReferenceStore(
+    REFERENCE_STORE_DIR,
+    analyze_references,
+    model_version=reference_model_version()
+)
     
     
     
 
+def predict_confidence(feature_matrix):
+    """
+    Confidence level and score for each row of a (n_clips, 19) feature matrix
+    """
+    model = models.get('confidence')
+    predicted_proba = model.predict_proba(np.atleast_2d(feature_matrix))
+    predicted_labels = model.classes_[np.argmax(predicted_proba, axis=1)]
+    return [
+        {
+            'confidence_level': int(label),
+            'confidence_score': float(np.max(proba))
+        }
+        for label, proba in zip(predicted_labels, predicted_proba)
+    ]
+
+
+result_cache = ResultCache(RESULT_CACHE_SIZE, RESULT_CACHE_DIR, RESULT_CACHE_MAX_BYTES)
+
+
+def confidence_model_version():
+    try:
+        return f'{CONFIDENCE_MODEL_PATH}@{os.path.getmtime(CONFIDENCE_MODEL_PATH)}'
+    except OSError:
+        return CONFIDENCE_MODEL_PATH
+
+
+def predict_cache_key(upload):
+    # Hashed from the upload's stream in chunks, the recording is never held in memory whole
+    return ResultCache.key_file(upload, 'predict', confidence_model_version(), FEATURE_SAMPLE_RATE, 'features-v2')
+
+
+def transcribe_cache_key(data, mode, tier=WHISPER_MODEL_NAME):
+    return ResultCache.key(data, 'transcribe', tier, mode)
+
+
+def cached_transcription(data, mode, tier):
+    """
+    A cached /transcribe response from the given tier or a more accurate one
+    """
+    for cached_tier in whisper_tiers.at_least(tier):
+        cached = result_cache.get(transcribe_cache_key(data, mode, cached_tier))
+        if cached is not None:
+            return cached
+    return None
+
+
+def cached_json(value):
+    response = jsonify(value)
+    response.headers['X-Cache'] = 'HIT'
+    return response
+
+
 @app.route('/predict', methods=['POST'])
 def predict():
     if 'audio' in request.files:
-        audio_file = request.files['audio']
-        audio_file.save('temp_audio.wav')  
-        features = preprocess_audio('temp_audio.wav')
-        features_reshaped = features.reshape(1, -1)
-        predicted_class = model.predict(features_reshaped)
-        predicted_label = predicted_class[0]  
-        predicted_proba = model.predict_proba(features_reshaped) 
-        predicted_confidence = np.max(predicted_proba)
-        os.remove('temp_audio.wav')
-        
-        return jsonify({
-            'confidence_level': int(predicted_label),
-            'confidence_score': float(predicted_confidence)  #
-        })
+        upload = request.files['audio'].stream
+        cache_key = predict_cache_key(upload)
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            return cached_json(cached)
+
+        features = features_from_file(upload, FEATURE_SAMPLE_RATE, streaming=STREAM_FEATURES)
+        prediction = predict_confidence(features)[0]
+        result_cache.put(cache_key, prediction)
+        return jsonify(prediction)
 
     elif 'text' in request.json:
         text_message = request.json['text']
@@ -184,22 +425,126 @@ def predict():
     else: 
         return jsonify({'error': 'No audio file or text provided'}), 400
 
-UPLOAD_FOLDER = 'uploads'
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+
+_audio_pool = None
 
 
+def get_audio_pool():
+    global _audio_pool
+    if _audio_pool is None:
+        # spawn: a forked child would inherit torch's thread pools and locks from the server
+        _audio_pool = ProcessPoolExecutor(max_workers=AUDIO_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+    return _audio_pool
 
-def transcribe_audio(file_path):
+
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    """
+    Confidence for every 'audio' file of one interview in a single round-trip
+    """
+    audio_files = request.files.getlist('audio')
+    if not audio_files:
+        return jsonify({'error': 'No audio files provided'}), 400
+
+    temp_paths = []
     try:
-        if os.path.exists(file_path):
-            print(f"File exists: {file_path}")
-        else:
-            print(f"File not found: {file_path}")
+        results = [{'filename': audio_file.filename} for audio_file in audio_files]
+
+        # Feature extraction runs in parallel across processes for files not seen before;
+        # each upload is handed over as a temporary file rather than pickled bytes
+        pending = []
+        for result, audio_file in zip(results, audio_files):
+            cache_key = predict_cache_key(audio_file.stream)
+            cached = result_cache.get(cache_key)
+            if cached is not None:
+                result.update(cached)
+            else:
+                temp_paths.append(copy_to_temp_file(audio_file.stream))
+                pending.append((result, cache_key, get_audio_pool().submit(
+                    features_from_path, temp_paths[-1], FEATURE_SAMPLE_RATE, STREAM_FEATURES
+                )))
+
+        extracted = []
+        for result, cache_key, future in pending:
+            try:
+                extracted.append((result, cache_key, future.result()))
+            except Exception as e:
+                logger.error(f"Feature extraction failed for {result['filename']}: {str(e)}")
+                result['error'] = str(e)
+
+        # One vectorized prediction over the stacked feature matrix
+        if extracted:
+            predictions = predict_confidence(np.vstack([features for _, _, features in extracted]))
+            for (result, cache_key, _), prediction in zip(extracted, predictions):
+                result_cache.put(cache_key, prediction)
+                result.update(prediction)
+
+        return jsonify({
+            'success': True,
+            'results': results
+        })
+
+    except Exception as e:
+        logger.error(f"Unexpected error in predict batch endpoint: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+    finally:
+        for path in temp_paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
 
+# Process pools only start on first use, so unused tiers cost nothing
+chunked_transcribers = {
+    tier: ChunkedTranscriber(
+        tier, processes=TRANSCRIBE_PROCESSES, sr=WHISPER_SAMPLE_RATE,
+        model_loader=lambda tier=tier: models.get(whisper_model_key(tier))
+    )
+    for tier in dict.fromkeys([WHISPER_MODEL_NAME] + WHISPER_TIERS)
+}
 
-        print(f"Current working directory: {os.getcwd()}")
-        print(f"Attempting to transcribe file: {file_path}")
-        result = whisper_model.transcribe(file_path, fp16=False)
+whisper_tiers = WhisperTierPolicy(
+    WHISPER_TIERS,
+    busy_depth=WHISPER_BUSY_DEPTH,
+    peak_depth=WHISPER_PEAK_DEPTH,
+    long_seconds=WHISPER_LONG_SECONDS
+)
+
+
+def transcription_load():
+    """
+    Transcriptions running synchronously (streams included) plus async jobs running or waiting in the queue
+    """
+    return whisper_tiers.in_flight() + transcription_queue.active() + transcription_queue.depth()
+
+
+def choose_whisper_tier(duration, hint=None):
+    return whisper_tiers.choose(transcription_load(), duration, hint)
+
+
+def run_whisper(audio, mode=None, tier=None):
+    """
+    Whisper result for 16 kHz audio, either in one pass ("full") or silence-split
+    chunks transcribed in parallel ("chunked"), with the given model tier
+    """
+    tier = tier or WHISPER_MODEL_NAME
+    with whisper_tiers.track():
+        if (mode or TRANSCRIBE_MODE) == 'chunked':
+            return chunked_transcribers[tier].transcribe(audio)
+        return models.get(whisper_model_key(tier)).transcribe(audio, fp16=False)
+
+
+def transcribe_audio(audio, sr=WHISPER_SAMPLE_RATE, mode=None):
+    """
+    Transcribe a file path or a decoded audio buffer with Whisper
+    """
+    try:
+        if isinstance(audio, (str, os.PathLike)):
+            with open(audio, 'rb') as f:
+                audio, sr = decode_audio(f.read(), sr=WHISPER_SAMPLE_RATE)
+        result = run_whisper(to_whisper_input(audio, sr), mode)
         print (result)
         return result['text']  
     except Exception as e:
@@ -209,110 +554,297 @@ def transcribe_audio(file_path):
 
 
 
-def compare_answers(candidate_answer: str, actual_answers: Union[str, List[str]]) -> Dict:
+def select_best_match(references, candidate_analyses):
     """
-    Enhanced answer comparison with proper error handling and input validation
+    Score every (reference, candidate version) pair and return the best one
     """
-    try:
-        # Input validation
-        if not candidate_answer or not isinstance(candidate_answer, str):
-            raise ValueError("Invalid candidate answer provided")
+    max_similarity = 0
+    best_match_info = None
+    
+    # Semantic similarity of every pair at once
+    similarities = similarity_matrix(references, candidate_analyses)
+    
+    for reference, reference_similarities in zip(references, similarities):
+        for candidate, similarity in zip(candidate_analyses, reference_similarities):
+            # Calculate information overlap
+            entity_matches = set(candidate.entities) & set(reference.entities)
+            noun_matches = set(candidate.noun_phrases) & set(reference.noun_phrases)
+            verb_matches = set(candidate.main_verbs) & set(reference.main_verbs)
+            
+            # Calculate weighted information score
+            total_elements = max(len(candidate.entities + reference.entities), 1)
+            info_score = float(
+                (len(entity_matches) * 0.4 +
+                len(noun_matches) * 0.3 +
+                len(verb_matches) * 0.3) / total_elements
+            )
             
-        # Handle both string and list inputs for actual_answers
-        if isinstance(actual_answers, str):
-            actual_answers = [actual_answers]
-        elif not isinstance(actual_answers, list) or not all(isinstance(x, str) for x in actual_answers):
-            raise ValueError("actual_answers must be a string or list of strings")
+            # Combine semantic similarity with information score
+            combined_score = float(similarity * 0.7 + info_score * 0.3)
             
-        # Ensure non-empty answers
-        if not candidate_answer.strip() or not any(ans.strip() for ans in actual_answers):
-            raise ValueError("Empty answers provided")
+            if combined_score > max_similarity:
+                max_similarity = combined_score
+                best_match_info = {
+                    'semantic_similarity': float(similarity),
+                    'info_score': float(info_score),
+                    'combined_score': float(combined_score),
+                    'key_matches': {
+                        'entities': list(entity_matches),
+                        'noun_phrases': list(noun_matches),
+                        'main_verbs': list(verb_matches)
+                    }
+                }
+    
+    return max_similarity, best_match_info
 
-        # Log the comparison attempt
-        logger.info(f"Comparing answers - Candidate length: {len(candidate_answer)}, Number of actual answers: {len(actual_answers)}")
 
-        # Preprocess answers
-        processed_candidate = preprocess_text(candidate_answer.lower())
-        processed_actuals = [preprocess_text(answer.lower()) for answer in actual_answers]
-        
-        # Generate paraphrases for candidate answer
-        candidate_paraphrases = generate_paraphrases(candidate_answer)
-        
-        # Calculate similarities
-        max_similarity = 0
-        best_match_info = None
-        
-        # Compare with original and paraphrased versions
-        all_candidate_versions = [processed_candidate] + candidate_paraphrases
-        
-        for actual_answer in processed_actuals:
-            for candidate_version in all_candidate_versions:
-                # Get semantic similarity
-                similarity = get_semantic_similarity(candidate_version, actual_answer)
-                
-                # Extract and compare key information
-                candidate_info = extract_key_information(candidate_version)
-                actual_info = extract_key_information(actual_answer)
-                
-                # Calculate information overlap
-                entity_overlap = len(set(candidate_info['entities']) & set(actual_info['entities']))
-                noun_overlap = len(set(candidate_info['noun_phrases']) & set(actual_info['noun_phrases']))
-                verb_overlap = len(set(candidate_info['main_verbs']) & set(actual_info['main_verbs']))
-                
-                # Calculate weighted information score
-                total_elements = max(len(candidate_info['entities'] + actual_info['entities']), 1)
-                info_score = float(
-                    (entity_overlap * 0.4 +
-                    noun_overlap * 0.3 +
-                    verb_overlap * 0.3) / total_elements
-                )
-                
-                # Combine semantic similarity with information score
-                combined_score = float(similarity * 0.7 + info_score * 0.3)
-                
-                if combined_score > max_similarity:
-                    max_similarity = combined_score
-                    best_match_info = {
-                        'semantic_similarity': float(similarity),
-                        'info_score': float(info_score),
-                        'combined_score': float(combined_score),
-                        'key_matches': {
-                            'entities': list(set(candidate_info['entities']) & set(actual_info['entities'])),
-                            'noun_phrases': list(set(candidate_info['noun_phrases']) & set(actual_info['noun_phrases'])),
-                            'main_verbs': list(set(candidate_info['main_verbs']) & set(actual_info['main_verbs']))
-                        }
-                    }
+def answers_for(actual_answers, question_id=None):
+    """
+    The given actual answer(s), or the ones registered for question_id through /references
+    """
+    if actual_answers or question_id is None:
+        return actual_answers
+    answers = reference_store.question_answers(question_id)
+    if not answers:
+        raise ValueError(f"No reference answers registered for question_id {question_id}")
+    return answers
+
+
+def validate_answers(candidate_answer, actual_answers) -> List[str]:
+    """
+    Validate one comparison's inputs and return the actual answers as a list
+    """
+    # Input validation
+    if not candidate_answer or not isinstance(candidate_answer, str):
+        raise ValueError("Invalid candidate answer provided")
         
-        # Define thresholds
-        high_threshold = 0.85
-        medium_threshold = 0.70
+    # Handle both string and list inputs for actual_answers
+    if isinstance(actual_answers, str):
+        actual_answers = [actual_answers]
+    elif not isinstance(actual_answers, list) or not all(isinstance(x, str) for x in actual_answers):
+        raise ValueError("actual_answers must be a string or list of strings")
         
-        # Determine confidence level
-        if max_similarity >= high_threshold:
-            confidence = "high"
-            is_correct = True
-        elif max_similarity >= medium_threshold:
-            confidence = "medium"
-            is_correct = True
-        else:
-            confidence = "low"
-            is_correct = False
-        
-        result = {
-            'is_correct': is_correct,
-            'confidence': confidence,
-            'similarity_score': float(max_similarity),
-            'match_details': best_match_info,
-            'feedback': generate_feedback(best_match_info) if best_match_info else "Unable to analyze answer"
-        }
+    # Ensure non-empty answers
+    if not candidate_answer.strip() or not any(ans.strip() for ans in actual_answers):
+        raise ValueError("Empty answers provided")
+
+    return actual_answers
+
+
+# Define thresholds
+HIGH_THRESHOLD = 0.85
+MEDIUM_THRESHOLD = 0.70
+
+# Cascade scoring: paraphrase only answers whose original score is within CASCADE_BAND below a threshold
+COMPARE_CASCADE = os.environ.get('COMPARE_CASCADE', 'false').lower() == 'true'
+CASCADE_BAND = float(os.environ.get('CASCADE_BAND', 0.05))
+
+# Only the REFERENCE_TOP_K references closest to the candidate (SBERT cosine) get full scoring, 0 disables
+REFERENCE_TOP_K = int(os.environ.get('REFERENCE_TOP_K', 5))
+
+# Per-process cache of comparison results; concurrent identical comparisons share one computation
+COMPARE_CACHE_SIZE = int(os.environ.get('COMPARE_CACHE_SIZE', 1024))
+COMPARE_CACHE_TTL = float(os.environ.get('COMPARE_CACHE_TTL', 3600))
+
+compare_cache = LRUCache(COMPARE_CACHE_SIZE, ttl=COMPARE_CACHE_TTL or None)
+compare_flights = SingleFlight()
+
+
+def prefilter_references(candidate, references, top_k=REFERENCE_TOP_K):
+    """
+    Keep the top_k references whose SBERT embeddings are closest to the candidate's
+    """
+    if top_k <= 0 or len(references) <= top_k:
+        return references
+    
+    embeddings = np.asarray([reference.embedding for reference in references], dtype=np.float64)
+    norms = np.linalg.norm(embeddings, axis=1) * (np.linalg.norm(candidate.embedding) or 1.0)
+    scores = np.divide(embeddings @ candidate.embedding, norms, out=np.zeros(len(references)), where=norms > 0)
+    
+    # Keep the survivors in their original order so ties resolve as before
+    keep = np.sort(np.argpartition(-scores, top_k - 1)[:top_k])
+    return [references[i] for i in keep]
+
+
+def build_comparison_result(max_similarity, best_match_info) -> Dict:
+    # Determine confidence level
+    if max_similarity >= HIGH_THRESHOLD:
+        confidence = "high"
+        is_correct = True
+    elif max_similarity >= MEDIUM_THRESHOLD:
+        confidence = "medium"
+        is_correct = True
+    else:
+        confidence = "low"
+        is_correct = False
+    
+    return {
+        'is_correct': is_correct,
+        'confidence': confidence,
+        'similarity_score': float(max_similarity),
+        'match_details': best_match_info,
+        'feedback': generate_feedback(best_match_info) if best_match_info else "Unable to analyze answer"
+    }
+
+
+def is_ambiguous(score, band=CASCADE_BAND):
+    """
+    Whether a score is close enough below a threshold for paraphrases to change the verdict.
+    Paraphrases only add references, so the best score can rise but never fall.
+    """
+    return HIGH_THRESHOLD - band <= score < HIGH_THRESHOLD or MEDIUM_THRESHOLD - band <= score < MEDIUM_THRESHOLD
+
+
+def score_comparisons(comparisons, cascade=None) -> List[Dict]:
+    """
+    Score validated (candidate_answer, actual_answers) pairs with one batched
+    reference lookup and, per tier, one T5 call, one spaCy pass and one SBERT batch.
+
+    With cascade on, every original answer is scored first and only the
+    ambiguous ones are paraphrased and rescored. Each result reports the
+    tier that decided it in 'decided_by' ("original" or "paraphrases").
+    """
+    if cascade is None:
+        cascade = COMPARE_CASCADE
+    
+    # Reference-side analyses come precomputed from the store
+    references = reference_store.get_many([answer for _, actuals in comparisons for answer in actuals])
+    item_references = []
+    offset = 0
+    for _, actuals in comparisons:
+        item_references.append(references[offset:offset + len(actuals)])
+        offset += len(actuals)
+    
+    # Tier 1: the normalized original answers, one spaCy pass for all of them
+    originals = analyze_texts([candidate for candidate, _ in comparisons], normalize=True)
+    
+    # Cheap SBERT ranking narrows long reference lists before key-information scoring
+    item_references = [
+        prefilter_references(original, references_i)
+        for original, references_i in zip(originals, item_references)
+    ]
+    
+    results = [None] * len(comparisons)
+    pending = []
+    for i, (original, references_i) in enumerate(zip(originals, item_references)):
+        if cascade:
+            max_similarity, best_match_info = select_best_match(references_i, [original])
+            if not is_ambiguous(max_similarity):
+                results[i] = build_comparison_result(max_similarity, best_match_info)
+                results[i]['decided_by'] = 'original'
+                continue
+        pending.append(i)
+    
+    if cascade:
+        logger.info(f"Cascade decided {len(comparisons) - len(pending)} of {len(comparisons)} answers without paraphrasing")
+    if not pending:
+        return results
+    
+    # Tier 2: generate paraphrases and compare with original and paraphrased versions
+    paraphrases = generate_paraphrases_batch([comparisons[i][0] for i in pending])
+    paraphrase_analyses = analyze_texts(
+        [paraphrase for candidate_paraphrases in paraphrases for paraphrase in candidate_paraphrases],
+        normalize=False
+    )
+    
+    offset = 0
+    for i, candidate_paraphrases in zip(pending, paraphrases):
+        item_analyses = [originals[i]] + paraphrase_analyses[offset:offset + len(candidate_paraphrases)]
+        offset += len(candidate_paraphrases)
         
-        logger.info(f"Comparison completed successfully. Confidence: {confidence}, Score: {max_similarity}")
-        return result
+        # Calculate similarities
+        max_similarity, best_match_info = select_best_match(item_references[i], item_analyses)
+        results[i] = build_comparison_result(max_similarity, best_match_info)
+        results[i]['decided_by'] = 'paraphrases'
+    
+    return results
+
+
+def compare_cache_key(candidate_answer, actual_answers, cascade):
+    """
+    Everything a comparison result depends on: the exact texts (spaCy entities and
+    noun phrases are case and whitespace sensitive), the models and the scoring settings
+    """
+    texts = json.dumps([candidate_answer, actual_answers]).encode('utf-8')
+    return ResultCache.key(
+        texts, 'compare', reference_store.model_version, T5_MODEL_NAME,
+        REFERENCE_TOP_K, cascade, CASCADE_BAND, 'compare-v1'
+    )
+
+
+def compare_answers(candidate_answer: str, actual_answers: Union[str, List[str]], cascade: Optional[bool] = None) -> Dict:
+    """
+    Enhanced answer comparison with proper error handling and input validation
+    """
+    try:
+        actual_answers = validate_answers(candidate_answer, actual_answers)
+        cascade = COMPARE_CASCADE if cascade is None else bool(cascade)
+        cache_key = compare_cache_key(candidate_answer, actual_answers, cascade)
+
+        def compute():
+            # A flight that finished just before this one started has already stored the result
+            cached = compare_cache.get(cache_key)
+            if cached is not None:
+                logger.info("Comparison served from cache")
+                return cached
+
+            # Log the comparison attempt
+            logger.info(f"Comparing answers - Candidate length: {len(candidate_answer)}, Number of actual answers: {len(actual_answers)}")
+
+            result = score_comparisons([(candidate_answer, actual_answers)], cascade=cascade)[0]
+            compare_cache.put(cache_key, result)
+
+            logger.info(f"Comparison completed successfully. Confidence: {result['confidence']}, Score: {result['similarity_score']}")
+            return result
+
+        # Callers rename keys in the result, never hand out the cached dict itself
+        return copy.deepcopy(compare_flights.do(cache_key, compute))
 
     except Exception as e:
         logger.error(f"Error in compare_answers: {str(e)}")
         raise
 
+
+def compare_answers_batch(items: List[Dict], cascade: Optional[bool] = None) -> List[Dict]:
+    """
+    compare_answers for many {candidate_answer, actual_answer} items at once.
+    Invalid items get an 'error' entry instead of failing the whole batch.
+    """
+    cascade = COMPARE_CASCADE if cascade is None else bool(cascade)
+    results = [None] * len(items)
+    # Uncached comparisons by cache key, each scored once however often it repeats in the batch
+    pending = {}
+
+    for i, item in enumerate(items):
+        try:
+            if not isinstance(item, dict):
+                raise ValueError("Each item must be an object")
+            candidate_answer = item.get('candidate_answer')
+            actual_answers = validate_answers(
+                candidate_answer, answers_for(item.get('actual_answer'), item.get('question_id'))
+            )
+        except ValueError as ve:
+            results[i] = {'error': str(ve)}
+            continue
+
+        cache_key = compare_cache_key(candidate_answer, actual_answers, cascade)
+        cached = compare_cache.get(cache_key)
+        if cached is not None:
+            results[i] = copy.deepcopy(cached)
+        else:
+            pending.setdefault(cache_key, ((candidate_answer, actual_answers), []))[1].append(i)
+
+    logger.info(f"Comparing batch - Items: {len(items)}, To score: {len(pending)}")
+
+    if pending:
+        scored = score_comparisons([comparison for comparison, _ in pending.values()], cascade=cascade)
+        for (cache_key, (_, indices)), result in zip(pending.items(), scored):
+            compare_cache.put(cache_key, result)
+            for i in indices:
+                results[i] = copy.deepcopy(result)
+
+    return results
+
 def generate_feedback(match_info):
     """
     Generate detailed feedback based on the matching results
@@ -340,24 +872,188 @@ def transcribe():
         if 'audio' not in request.files:
             return jsonify({'error': 'No audio file provided'}), 400
 
-        audio_file = request.files['audio']
-        audio_file_path = os.path.join('uploads', 'audio_file.wav')
-        audio_file.save(audio_file_path)
+        data = request.files['audio'].read()
+        mode = request.form.get('mode', TRANSCRIBE_MODE)
+        quality = request.form.get('quality')
+        # Length only lowers the tier, so a result cached at the zero-length choice is always good enough
+        cached = cached_transcription(data, mode, choose_whisper_tier(0, quality))
+        if cached is not None:
+            return cached_json(cached)
+
+        audio, _ = decode_audio(data, sr=WHISPER_SAMPLE_RATE)
+        tier = choose_whisper_tier(len(audio) / WHISPER_SAMPLE_RATE, quality)
+        cached = cached_transcription(data, mode, tier)
+        if cached is not None:
+            return cached_json(cached)
 
-        result = whisper_model.transcribe(audio_file_path, fp16=False)
+        result = run_whisper(audio, mode, tier)
         transcribed_text = result['text']
         
-        os.remove(audio_file_path)
-        
-        return jsonify({
+        response = {
             'success': True,
-            'candidate_answer': transcribed_text
-        })
+            'candidate_answer': transcribed_text,
+            'whisper_tier': tier
+        }
+        if mode == 'chunked':
+            response['segments'] = result['segments']
+        result_cache.put(transcribe_cache_key(data, mode, tier), response)
+        return jsonify(response)
+
+    except ValueError as ve:
+        return jsonify({'error': str(ve)}), 400
 
     except Exception as e:
         print(f"Error in /transcribe route: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+# Each queue worker's Whisper copy is a registry entry of its own, so it counts
+# towards the memory budget and shows up in /models like every other model
+for slot in range(TRANSCRIPTION_WORKERS):
+    models.register(f'whisper-queue-{slot}', load_whisper_model)
+
+transcription_queue = TranscriptionQueue(
+    lambda slot: models.get(f'whisper-queue-{slot}'),
+    num_workers=TRANSCRIPTION_WORKERS,
+    max_pending=TRANSCRIPTION_MAX_PENDING,
+    callback_hosts=TRANSCRIPTION_CALLBACK_HOSTS
+)
+
+
+@app.route('/transcribe/jobs', methods=['POST'])
+def submit_transcription_job():
+    """
+    Queue audio for asynchronous transcription; poll the returned job or pass a callback_url
+    """
+    try:
+        if 'audio' not in request.files:
+            return jsonify({'error': 'No audio file provided'}), 400
+
+        # Rejected before the upload is decoded
+        callback_url = request.form.get('callback_url')
+        if callback_url:
+            transcription_queue.check_callback_url(callback_url)
+
+        audio, _ = decode_audio(request.files['audio'].read(), sr=WHISPER_SAMPLE_RATE)
+        job_id = transcription_queue.submit(
+            audio,
+            duration=len(audio) / WHISPER_SAMPLE_RATE,
+            callback_url=callback_url
+        )
+        return jsonify({
+            'success': True,
+            'job_id': job_id,
+            'status': 'queued',
+            'queue_depth': transcription_queue.depth()
+        }), 202
+
+    except ValueError as ve:
+        return jsonify({'error': str(ve)}), 400
+
+    except (QueueFullError, WorkersUnavailableError) as qe:
+        return jsonify({'error': str(qe)}), 503
+
+    except Exception as e:
+        print(f"Error in /transcribe/jobs route: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/transcribe/jobs/<job_id>', methods=['GET'])
+def get_transcription_job(job_id):
+    job = transcription_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
+
+STREAM_WINDOW_SECONDS = 30
+# A segment ending this close to the end of a full window may be cut mid-word
+STREAM_EDGE_SECONDS = 1.0
+
+
+def iter_transcript_segments(audio):
+    """
+    Transcribe 16 kHz audio window by window, yielding segments as soon as each window is decoded.
+
+    A segment ending within STREAM_EDGE_SECONDS of the end of a full window may
+    be cut mid-word, so it is dropped and the next window starts at its
+    beginning, like whisper's own seek loop. Otherwise the next window starts
+    where this one ended. The text so far is passed as the prompt to keep context.
+    """
+    whisper_model = models.get('whisper')
+    window = STREAM_WINDOW_SECONDS * WHISPER_SAMPLE_RATE
+    seek = 0
+    previous_text = ''
+
+    while seek < len(audio):
+        chunk = audio[seek:seek + window]
+        offset = seek / WHISPER_SAMPLE_RATE
+        # Counted as load only while a window decodes, not while the client reads events
+        with whisper_tiers.track():
+            result = whisper_model.transcribe(
+                chunk,
+                fp16=False,
+                initial_prompt=previous_text[-200:] or None,
+                condition_on_previous_text=False
+            )
+        segments = result['segments']
+
+        if (seek + window < len(audio) and len(segments) > 1
+                and segments[-1]['end'] >= STREAM_WINDOW_SECONDS - STREAM_EDGE_SECONDS):
+            last = segments.pop()
+            next_seek = seek + int(last['start'] * WHISPER_SAMPLE_RATE)
+        else:
+            next_seek = seek + window
+
+        for segment in segments:
+            text = segment['text']
+            previous_text += text
+            yield {
+                'start': round(offset + segment['start'], 2),
+                'end': round(offset + segment['end'], 2),
+                'text': text
+            }
+        seek = max(next_seek, seek + WHISPER_SAMPLE_RATE)
+
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.route('/transcribe/stream', methods=['POST'])
+def transcribe_stream():
+    """
+    Server-Sent Events variant of /transcribe: one "segment" event per decoded
+    segment, then a "done" event with the same payload /transcribe returns
+    """
+    if 'audio' not in request.files:
+        return jsonify({'error': 'No audio file provided'}), 400
+
+    try:
+        audio, _ = decode_audio(request.files['audio'].read(), sr=WHISPER_SAMPLE_RATE)
+    except Exception as e:
+        print(f"Error in /transcribe/stream route: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+    def generate():
+        texts = []
+        try:
+            for segment in iter_transcript_segments(audio):
+                texts.append(segment['text'])
+                yield sse_event('segment', segment)
+            yield sse_event('done', {
+                'success': True,
+                'candidate_answer': ''.join(texts)
+            })
+        except Exception as e:
+            print(f"Error in /transcribe/stream route: {str(e)}")
+            yield sse_event('error', {'error': str(e)})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/compare', methods=['POST'])
 def compare():
     try:
@@ -366,16 +1062,17 @@ def compare():
             return jsonify({'error': 'No JSON data provided'}), 400
         
         candidate_answer = data.get('candidate_answer')
-        actual_answers = data.get('actual_answer')
+        # question_id looks up the answers stored with POST /references
+        actual_answers = answers_for(data.get('actual_answer'), data.get('question_id'))
         
         if not candidate_answer:
             return jsonify({'error': 'Missing candidate_answer'}), 400
         if not actual_answers:
-            return jsonify({'error': 'Missing actual_answer'}), 400
+            return jsonify({'error': 'Missing actual_answer or question_id'}), 400
         
         logger.info(f"Received comparison request - Candidate Answer Length: {len(str(candidate_answer))}")
         
-        result = compare_answers(candidate_answer, actual_answers)
+        result = compare_answers(candidate_answer, actual_answers, cascade=data.get('cascade'))
         result['similarity_scores'] = result.pop('similarity_score') 
         logger.info("Comparison completed successfully")
         return jsonify(result)
@@ -388,6 +1085,172 @@ def compare():
         logger.error(f"Unexpected error in compare endpoint: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/compare/batch', methods=['POST'])
+def compare_batch():
+    """
+    Grade every answer of an interview in one call: {"items": [{candidate_answer, actual_answer}, ...]}.
+    An item can give a registered question_id instead of actual_answer
+    """
+    try:
+        data = request.json
+        if not data:
+            return jsonify({'error': 'No JSON data provided'}), 400
+
+        items = data.get('items')
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'items must be a non-empty list'}), 400
+
+        results = compare_answers_batch(items, cascade=data.get('cascade'))
+        for result in results:
+            if 'similarity_score' in result:
+                result['similarity_scores'] = result.pop('similarity_score')
+
+        return jsonify({
+            'success': True,
+            'results': results
+        })
+
+    except Exception as e:
+        logger.error(f"Unexpected error in compare batch endpoint: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+def parse_actual_answers(form):
+    """
+    actual_answer form field(s) of a multipart request: repeated fields or one JSON list
+    """
+    answers = form.getlist('actual_answer')
+    if len(answers) == 1 and answers[0].lstrip().startswith('['):
+        answers = json.loads(answers[0])
+    return answers
+
+
+_pipeline_pool = ThreadPoolExecutor(max_workers=int(os.environ.get('PIPELINE_THREADS', 4)))
+
+
+def analyze_answer_audio(audio, sr, actual_answers, transcribe_mode=None, cascade=None, quality=None):
+    """
+    Transcription, voice confidence and answer comparison from one decoded buffer.
+    Whisper and feature extraction run concurrently; the transcript goes straight to compare_answers.
+    """
+    tier = choose_whisper_tier(len(audio) / sr, quality)
+
+    def confidence():
+        return predict_confidence(preprocess_audio(audio, sr))[0]
+
+    confidence_future = _pipeline_pool.submit(confidence)
+    transcription = run_whisper(to_whisper_input(audio, sr), transcribe_mode, tier)['text']
+
+    result = {
+        'success': True,
+        'transcription': transcription,
+        'whisper_tier': tier
+    }
+
+    try:
+        comparison = compare_answers(transcription, actual_answers, cascade=cascade)
+        comparison['similarity_scores'] = comparison.pop('similarity_score')
+        result['comparison'] = comparison
+    except ValueError as ve:
+        result['comparison'] = {'error': str(ve)}
+
+    try:
+        result['prediction'] = confidence_future.result()
+    except Exception as e:
+        logger.error(f"Confidence prediction failed: {str(e)}")
+        result['prediction'] = {'error': str(e)}
+
+    return result
+
+
+@app.route('/analyze-answer', methods=['POST'])
+def analyze_answer():
+    """
+    One upload per spoken answer: transcript, voice confidence and comparison with the reference answer(s)
+    """
+    try:
+        if 'audio' not in request.files:
+            return jsonify({'error': 'No audio file provided'}), 400
+
+        actual_answers = answers_for(parse_actual_answers(request.form), request.form.get('question_id'))
+        if not actual_answers:
+            return jsonify({'error': 'Missing actual_answer or question_id'}), 400
+
+        # Decode once at the native rate, each stage resamples from this buffer
+        audio, sr = decode_audio(request.files['audio'].read())
+
+        cascade = request.form.get('cascade')
+        return jsonify(analyze_answer_audio(
+            audio,
+            sr,
+            actual_answers,
+            transcribe_mode=request.form.get('mode'),
+            cascade=None if cascade is None else cascade.lower() == 'true',
+            quality=request.form.get('quality')
+        ))
+
+    except ValueError as ve:
+        logger.error(f"Validation error: {str(ve)}")
+        return jsonify({'error': str(ve)}), 400
+
+    except Exception as e:
+        logger.error(f"Unexpected error in analyze-answer endpoint: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/references', methods=['POST'])
+def register_references():
+    """
+    Precompute and store reference answers so /compare does no reference-side work
+    """
+    try:
+        data = request.json
+        if not data:
+            return jsonify({'error': 'No JSON data provided'}), 400
+
+        answers = data.get('actual_answer')
+        if isinstance(answers, str):
+            answers = [answers]
+        if not answers or not all(isinstance(x, str) and x.strip() for x in answers):
+            return jsonify({'error': 'actual_answer must be a non-empty string or list of strings'}), 400
+
+        keys = reference_store.register(
+            answers,
+            question_id=data.get('question_id'),
+            refresh=bool(data.get('refresh', False))
+        )
+        return jsonify({
+            'success': True,
+            'keys': keys,
+            'stored_answers': len(reference_store)
+        })
+
+    except Exception as e:
+        logger.error(f"Unexpected error in references endpoint: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/health', methods=['GET'])
+def health():
+    return jsonify({'status': 'ok'})
+
+
+@app.route('/ready', methods=['GET'])
+def ready():
+    ready = models.is_ready(WARMUP_NAMES)
+    return jsonify({
+        'ready': ready,
+        'models': models.status()
+    }), 200 if ready else 503
+
+
+@app.route('/models', methods=['GET'])
+def model_residency():
+    return jsonify(models.residency())
+
+
+WARMUP_NAMES = [name.strip() for name in WARMUP_MODELS.split(',') if name.strip() and name.strip() != 'none']
+if WARMUP_NAMES:
+    models.warm_up_in_background(WARMUP_NAMES)
+
 
 if __name__ == '__main__':
    app.run(host='0.0.0.0', port=3000)
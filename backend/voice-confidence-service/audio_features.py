@@ -0,0 +1,269 @@
+import io
+from functools import lru_cache
+
+import librosa
+import numpy as np
+import scipy.fft
+
+from audio_io import decode_audio, open_audio_blocks
+
+
+# Rate every clip is decoded at before feature extraction
+ANALYSIS_SAMPLE_RATE = 22050
+
+# librosa defaults used by every feature in the original extractor
+N_FFT = 2048
+HOP_LENGTH = 512
+N_MFCC = 13
+
+FEATURE_COUNT = 19
+
+# STFT frames per block of the streaming extractor (about 6 s at 22.05 kHz)
+BLOCK_FRAMES = 256
+
+# power_to_db defaults: amin=1e-10 floors every value at -100 dB, top_db=80
+DB_FLOOR = -100.0
+TOP_DB = 80.0
+DB_BUCKET = 0.1
+DB_BUCKETS = 2000
+
+# chroma_stft estimates tuning as a peak over 100 residual bins of the voiced pitches
+# whose magnitude is above the median; magnitudes are bucketed at 1/32 octave
+TUNING_EDGES = np.linspace(-0.5, 0.5, 101)
+MAG_LOG2_FLOOR = -80
+MAG_BUCKETS_PER_OCTAVE = 32
+MAG_BUCKETS = 120 * MAG_BUCKETS_PER_OCTAVE
+
+
+def extract_features(audio, sr):
+    """
+    The 19 voice features (13 MFCC means, voiced pitch mean, spectral centroid,
+    spectral bandwidth, chroma mean) derived from a single STFT.
+
+    librosa.feature.mfcc/piptrack/spectral_*/chroma_stft each compute their
+    own STFT with the same parameters when given y; passing them the shared
+    magnitude or power spectrogram gives identical values for one FFT pass.
+    """
+    magnitude = np.abs(librosa.stft(audio, n_fft=N_FFT, hop_length=HOP_LENGTH))
+    power = magnitude ** 2
+
+    mel = librosa.feature.melspectrogram(S=power, sr=sr)
+    mfccs = librosa.feature.mfcc(S=librosa.power_to_db(mel), sr=sr, n_mfcc=N_MFCC)
+    mfccs_mean = np.mean(mfccs.T, axis=0)
+
+    pitches, _ = librosa.piptrack(S=magnitude, sr=sr, n_fft=N_FFT, hop_length=HOP_LENGTH)
+    pitch_mean = np.mean(pitches[pitches > 0]) if np.any(pitches) else 0
+
+    spectral_centroid = np.mean(librosa.feature.spectral_centroid(S=magnitude, sr=sr, n_fft=N_FFT, hop_length=HOP_LENGTH))
+    spectral_bandwidth = np.mean(librosa.feature.spectral_bandwidth(S=magnitude, sr=sr, n_fft=N_FFT, hop_length=HOP_LENGTH))
+    chroma = np.mean(librosa.feature.chroma_stft(S=power, sr=sr, n_fft=N_FFT, hop_length=HOP_LENGTH))
+
+    features = np.hstack([mfccs_mean, pitch_mean, spectral_centroid, spectral_bandwidth, chroma])
+    if len(features) < FEATURE_COUNT:
+        features = np.pad(features, (0, FEATURE_COUNT - len(features)))
+    return features
+
+
+@lru_cache(maxsize=4)
+def _chroma_banks(sr):
+    # One chroma filter bank per tuning chroma_stft can pick, stacked as (100 * 12, 1 + n_fft / 2)
+    return np.vstack([
+        librosa.filters.chroma(sr=sr, n_fft=N_FFT, tuning=tuning)
+        for tuning in TUNING_EDGES[:-1]
+    ])
+
+
+def _tuning_bins(residual):
+    # The bin np.histogram(residual, TUNING_EDGES) puts each value in
+    return np.clip(np.searchsorted(TUNING_EDGES, residual, side='right') - 1, 0, len(TUNING_EDGES) - 2)
+
+
+class StreamingFeatureExtractor:
+    """
+    The same 19 features as extract_features, accumulated block by block so
+    memory stays constant however long the recording is (about 5 MB of
+    histograms per extractor).
+
+    Frames are cut exactly as librosa.stft(center=True) does and every feature
+    except two is a per-frame value, so running sums give the same means. The
+    two recording-wide steps are kept as fixed-size histograms: the 80 dB
+    floor power_to_db applies below the loudest mel value (exact bucket sums,
+    only the 0.1 dB bucket holding the floor is estimated) and the median
+    magnitude chroma_stft uses to estimate tuning (chroma is accumulated for
+    every tuning it can pick, so only the pick itself is estimated).
+
+    The tuning pick is the one approximation that can show: voiced peaks in
+    the 1/32-octave magnitude bucket holding the median are counted in
+    proportion, so when two tuning bins are within a handful of peaks of each
+    other the neighbouring bin may win. Chroma then differs from librosa's by
+    about 1e-4 relative; every other feature matches to float precision.
+    Keeping every voiced peak would make the pick exact at ~12 KB per second.
+    """
+
+    def __init__(self, sr, block_frames=BLOCK_FRAMES):
+        self.sr = sr
+        self.block_frames = block_frames
+        # Centre padding, as librosa.stft(center=True, pad_mode='constant')
+        self._buffer = np.zeros(N_FFT // 2, dtype=np.float32)
+        self._samples = 0
+        self._frames = 0
+
+        n_mels = librosa.filters.mel(sr=sr, n_fft=N_FFT).shape[0]
+        self._db_max = DB_FLOOR
+        self._db_counts = np.zeros((n_mels, DB_BUCKETS), dtype=np.int64)
+        self._db_sums = np.zeros((n_mels, DB_BUCKETS))
+
+        self._pitch_sum = 0.0
+        self._pitch_count = 0
+        self._centroid_sum = 0.0
+        self._bandwidth_sum = 0.0
+
+        self._tuning_counts = np.zeros((MAG_BUCKETS, len(TUNING_EDGES) - 1), dtype=np.int32)
+        self._chroma_sums = np.zeros(len(TUNING_EDGES) - 1)
+
+    def update(self, samples):
+        self._samples += len(samples)
+        self._buffer = np.concatenate([self._buffer, np.asarray(samples, dtype=np.float32)])
+        span = (self.block_frames - 1) * HOP_LENGTH + N_FFT
+        start = 0
+        while len(self._buffer) - start >= span:
+            self._process(self._buffer[start:start + span])
+            start += self.block_frames * HOP_LENGTH
+        self._buffer = self._buffer[start:].copy()
+
+    def _process(self, y):
+        magnitude = np.abs(librosa.stft(y, n_fft=N_FFT, hop_length=HOP_LENGTH, center=False))
+        power = magnitude ** 2
+        self._frames += magnitude.shape[1]
+
+        mel_db = librosa.power_to_db(librosa.feature.melspectrogram(S=power, sr=self.sr), top_db=None)
+        self._db_max = max(self._db_max, float(mel_db.max()))
+        buckets = np.clip(((mel_db - DB_FLOOR) / DB_BUCKET).astype(np.intp), 0, DB_BUCKETS - 1)
+        flat = (buckets + np.arange(mel_db.shape[0])[:, None] * DB_BUCKETS).ravel()
+        size = self._db_counts.size
+        self._db_counts += np.bincount(flat, minlength=size).reshape(self._db_counts.shape)
+        self._db_sums += np.bincount(flat, weights=mel_db.ravel(), minlength=size).reshape(self._db_sums.shape)
+
+        pitches, _ = librosa.piptrack(S=magnitude, sr=self.sr, n_fft=N_FFT, hop_length=HOP_LENGTH)
+        voiced = pitches[pitches > 0]
+        self._pitch_sum += float(np.sum(voiced, dtype=np.float64))
+        self._pitch_count += voiced.size
+
+        self._centroid_sum += float(np.sum(librosa.feature.spectral_centroid(
+            S=magnitude, sr=self.sr, n_fft=N_FFT, hop_length=HOP_LENGTH
+        )))
+        self._bandwidth_sum += float(np.sum(librosa.feature.spectral_bandwidth(
+            S=magnitude, sr=self.sr, n_fft=N_FFT, hop_length=HOP_LENGTH
+        )))
+
+        # estimate_tuning runs piptrack on the power spectrogram chroma_stft was given
+        pitches, mags = librosa.piptrack(S=power, sr=self.sr, n_fft=N_FFT)
+        mask = pitches > 0
+        if mask.any():
+            residual = np.mod(12 * librosa.hz_to_octs(pitches[mask]), 1.0)
+            residual[residual >= 0.5] -= 1.0
+            log_mags = np.log2(np.maximum(mags[mask], np.finfo(np.float32).tiny))
+            mag_buckets = np.clip(
+                ((log_mags - MAG_LOG2_FLOOR) * MAG_BUCKETS_PER_OCTAVE).astype(np.intp), 0, MAG_BUCKETS - 1
+            )
+            flat = mag_buckets * self._tuning_counts.shape[1] + _tuning_bins(residual)
+            self._tuning_counts += np.bincount(
+                flat, minlength=self._tuning_counts.size
+            ).reshape(self._tuning_counts.shape)
+
+        raw_chroma = (_chroma_banks(self.sr) @ power).reshape(len(self._chroma_sums), 12, -1)
+        chroma = librosa.util.normalize(raw_chroma, norm=np.inf, axis=-2)
+        self._chroma_sums += chroma.sum(axis=(1, 2), dtype=np.float64)
+
+    def _mfcc_mean(self):
+        # mean over frames of max(dB, loudest - 80) per mel band, then the (linear) DCT
+        threshold = self._db_max - TOP_DB
+        edge = int(np.floor((threshold - DB_FLOOR) / DB_BUCKET))
+        totals = self._db_sums.sum(axis=1)
+        if edge >= 0:
+            below = slice(0, min(edge, DB_BUCKETS))
+            totals += (self._db_counts[:, below] * threshold - self._db_sums[:, below]).sum(axis=1)
+            if edge < DB_BUCKETS:
+                counts, sums = self._db_counts[:, edge], self._db_sums[:, edge]
+                totals += np.maximum(counts * threshold, sums) - sums
+        mel_db_mean = totals / self._frames
+        return scipy.fft.dct(mel_db_mean, type=2, norm='ortho')[:N_MFCC]
+
+    def _tuning_index(self):
+        per_bucket = self._tuning_counts.sum(axis=1)
+        total = per_bucket.sum()
+        if total == 0:
+            # pitch_tuning of an empty set is 0.0
+            return int(np.argmin(np.abs(TUNING_EDGES[:-1])))
+        # Voiced magnitudes ranked at or above total // 2 are >= np.median of them
+        rank = total // 2
+        cumulative = np.cumsum(per_bucket)
+        edge = int(np.searchsorted(cumulative, rank, side='right'))
+        # Entries of the bucket holding the median count in proportion to how many rank above it
+        above = cumulative[edge] - rank
+        counts = self._tuning_counts[edge + 1:].sum(axis=0) + self._tuning_counts[edge] * (above / per_bucket[edge])
+        return int(np.argmax(counts))
+
+    def finish(self):
+        total_frames = 1 + self._samples // HOP_LENGTH
+        tail = np.concatenate([self._buffer, np.zeros(N_FFT // 2, dtype=np.float32)])
+        remaining = total_frames - self._frames
+        if remaining > 0:
+            self._process(tail[:(remaining - 1) * HOP_LENGTH + N_FFT])
+        self._buffer = np.zeros(0, dtype=np.float32)
+
+        features = np.hstack([
+            self._mfcc_mean(),
+            self._pitch_sum / self._pitch_count if self._pitch_count else 0,
+            self._centroid_sum / self._frames,
+            self._bandwidth_sum / self._frames,
+            self._chroma_sums[self._tuning_index()] / (12 * self._frames)
+        ])
+        if len(features) < FEATURE_COUNT:
+            features = np.pad(features, (0, FEATURE_COUNT - len(features)))
+        return features
+
+
+def extract_features_streaming(blocks, sr):
+    """
+    19-dim feature vector from an iterable of mono float32 blocks
+    """
+    extractor = StreamingFeatureExtractor(sr)
+    for block in blocks:
+        extractor.update(block)
+    return extractor.finish()
+
+
+def iter_blocks(audio, block_size=BLOCK_FRAMES * HOP_LENGTH):
+    """
+    An already decoded buffer as consecutive views for extract_features_streaming
+    """
+    for start in range(0, len(audio), block_size):
+        yield audio[start:start + block_size]
+
+
+def features_from_file(f, sr=ANALYSIS_SAMPLE_RATE, streaming=False):
+    """
+    Extract the features of uploaded audio from a seekable binary file object.
+    Streaming reads it block by block; otherwise it is read and decoded whole.
+    """
+    if streaming:
+        sr, blocks = open_audio_blocks(f, sr=sr)
+        return extract_features_streaming(blocks, sr)
+    audio, sr = decode_audio(f.read(), sr=sr)
+    return extract_features(audio, sr)
+
+
+def features_from_path(path, sr=ANALYSIS_SAMPLE_RATE, streaming=False):
+    """
+    features_from_file for an audio file on disk; picklable for process pools
+    """
+    with open(path, 'rb') as f:
+        return features_from_file(f, sr, streaming)
+
+
+def features_from_bytes(data, sr=ANALYSIS_SAMPLE_RATE, streaming=False):
+    """
+    Decode uploaded audio bytes and extract its features; picklable for process pools
+    """
+    return features_from_file(io.BytesIO(data), sr, streaming)
@@ -0,0 +1,186 @@
+import io
+import os
+import shutil
+import subprocess
+import tempfile
+
+import librosa
+import numpy as np
+import soundfile as sf
+import soxr
+
+
+# Whisper models expect 16 kHz mono float32 input
+WHISPER_SAMPLE_RATE = 16000
+
+# Samples per block when audio is read incrementally
+BLOCK_SAMPLES = 65536
+
+
+def _decode_with_ffmpeg(source, sr, data=None):
+    # Same output format whisper.audio.load_audio asks ffmpeg for
+    cmd = [
+        'ffmpeg', '-threads', '0', '-i', source,
+        '-f', 's16le', '-ac', '1', '-acodec', 'pcm_s16le', '-ar', str(sr), '-'
+    ]
+    out = subprocess.run(cmd, input=data, capture_output=True, check=True).stdout
+    return np.frombuffer(out, np.int16).astype(np.float32) / 32768.0
+
+
+def probe_sample_rate(source, data=None):
+    """
+    Sample rate of the first audio stream according to ffprobe, None if it cannot tell
+    """
+    cmd = [
+        'ffprobe', '-v', 'error', '-select_streams', 'a:0',
+        '-show_entries', 'stream=sample_rate', '-of', 'default=noprint_wrappers=1:nokey=1', source
+    ]
+    try:
+        out = subprocess.run(cmd, input=data, capture_output=True, check=True).stdout
+        return int(out.split()[0])
+    except (OSError, subprocess.CalledProcessError, ValueError, IndexError):
+        return None
+
+
+def decode_with_ffmpeg(data, sr):
+    """
+    Decode container formats soundfile cannot read (webm, mp3, m4a, ...)
+    """
+    try:
+        return _decode_with_ffmpeg('pipe:0', sr, data=data)
+    except subprocess.CalledProcessError:
+        # Some containers need a seekable input, give ffmpeg a per-request unique file
+        fd, path = tempfile.mkstemp(suffix='.audio')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            return _decode_with_ffmpeg(path, sr, data=b'')
+        finally:
+            os.remove(path)
+
+
+def decode_audio(data, sr=None):
+    """
+    Decode uploaded audio bytes into a mono float32 buffer.
+
+    sr=None keeps the native sample rate like librosa.load(path, sr=None),
+    also for containers only ffmpeg reads (16 kHz if ffprobe cannot tell).
+    Returns (audio, sample_rate).
+    """
+    try:
+        audio, native_sr = sf.read(io.BytesIO(data), dtype='float32', always_2d=True)
+    except RuntimeError:
+        target_sr = sr or probe_sample_rate('pipe:0', data=data) or WHISPER_SAMPLE_RATE
+        return decode_with_ffmpeg(data, target_sr), target_sr
+
+    audio = audio.mean(axis=1)
+    if sr is not None and sr != native_sr:
+        audio = librosa.resample(audio, orig_sr=native_sr, target_sr=sr)
+        native_sr = sr
+    return np.ascontiguousarray(audio, dtype=np.float32), native_sr
+
+
+def _soundfile_blocks(f, sr, block_size):
+    native_sr = f.samplerate
+    resampler = None
+    if sr is not None and sr != native_sr:
+        # Streaming soxr HQ gives the same samples as librosa.resample's default soxr_hq
+        resampler = soxr.ResampleStream(native_sr, sr, 1, dtype='float32', quality='HQ')
+        # librosa.resample fixes the output length to ceil(n * ratio)
+        remaining = int(np.ceil(f.frames * sr / native_sr))
+
+    for block in f.blocks(blocksize=block_size, dtype='float32', always_2d=True):
+        block = block.mean(axis=1)
+        if resampler is None:
+            yield block
+            continue
+        block = resampler.resample_chunk(block, last=False)[:remaining]
+        remaining -= len(block)
+        if len(block):
+            yield block
+
+    if resampler is not None:
+        tail = resampler.resample_chunk(np.zeros(0, dtype=np.float32), last=True)[:remaining]
+        remaining -= len(tail)
+        if remaining > 0:
+            tail = np.concatenate([tail, np.zeros(remaining, dtype=np.float32)])
+        if len(tail):
+            yield tail
+
+
+def copy_to_temp_file(f):
+    """
+    Copy a binary file object to a new per-request file in chunks, returning its path
+    """
+    fd, path = tempfile.mkstemp(suffix='.audio')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            shutil.copyfileobj(f, out)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
+
+
+def _ffmpeg_blocks(path, sr, block_size):
+    # ffmpeg reads a seekable per-request file and streams s16le samples back.
+    # The generator owns the file; open_audio_blocks primes it past the first
+    # yield so closing it removes the file even if no block was read
+    try:
+        yield
+        cmd = [
+            'ffmpeg', '-nostdin', '-threads', '0', '-i', path,
+            '-f', 's16le', '-ac', '1', '-acodec', 'pcm_s16le', '-ar', str(sr), '-'
+        ]
+        with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL) as process:
+            pending = b''
+            while True:
+                raw = process.stdout.read(block_size * 2)
+                if not raw:
+                    break
+                # A pipe read can end mid-sample, carry the odd byte over
+                raw = pending + raw
+                usable = len(raw) // 2 * 2
+                pending = raw[usable:]
+                yield np.frombuffer(raw[:usable], np.int16).astype(np.float32) / 32768.0
+            if process.wait() != 0:
+                raise subprocess.CalledProcessError(process.returncode, cmd)
+    finally:
+        os.remove(path)
+
+
+def open_audio_blocks(source, sr=None, block_size=BLOCK_SAMPLES):
+    """
+    Read uploaded audio incrementally as mono float32 blocks.
+
+    source is the uploaded bytes or a seekable binary file object, such as an
+    upload's stream, which is then never read into memory as a whole. Gives
+    the same samples as decode_audio without holding the decoded recording
+    in memory. Returns (sample_rate, iterator of blocks).
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    try:
+        f = sf.SoundFile(source)
+    except RuntimeError:
+        source.seek(0)
+        path = copy_to_temp_file(source)
+        target_sr = sr or probe_sample_rate(path) or WHISPER_SAMPLE_RATE
+        blocks = _ffmpeg_blocks(path, target_sr, block_size)
+        next(blocks)
+        return target_sr, blocks
+
+    def blocks():
+        with f:
+            yield from _soundfile_blocks(f, sr, block_size)
+
+    return sr or f.samplerate, blocks()
+
+
+def to_whisper_input(audio, sr):
+    """
+    Resample an already decoded buffer to what whisper's transcribe expects
+    """
+    if sr != WHISPER_SAMPLE_RATE:
+        audio = librosa.resample(audio, orig_sr=sr, target_sr=WHISPER_SAMPLE_RATE)
+    return np.ascontiguousarray(audio, dtype=np.float32)
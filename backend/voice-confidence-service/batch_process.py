@@ -0,0 +1,252 @@
+"""
+Transcribe, score and rate the confidence of recorded answers offline, without the HTTP service.
+
+    python batch_process.py recordings/ --output results.jsonl [--workers 4]
+    python batch_process.py manifest.csv --output results.csv [--mode chunked] [--quality accurate]
+
+The input is a directory (every audio file below it is transcribed and rated)
+or a manifest: CSV with a "path" column, or JSONL with one {"path": ...}
+object per line. Each row can also have an "id" and an "actual_answer" (one
+answer, or a JSON list of answers); rows with answers are also compared like
+/analyze-answer. Relative paths are resolved against the manifest's folder.
+
+Recordings are spread over a pool of worker processes, each with its own
+models, longest first; with --mode chunked a worker transcribes the chunks of
+its recording itself, one after another. Results are appended to the output
+(JSONL or CSV, by extension) as soon as each recording finishes, so the output
+file doubles as the checkpoint: rerunning the same command skips every id
+already written with status "ok" and retries the rest. --restart discards the
+existing output.
+"""
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+
+AUDIO_EXTENSIONS = {'.wav', '.mp3', '.m4a', '.webm', '.ogg', '.flac', '.aac', '.mp4'}
+
+CSV_COLUMNS = [
+    'id', 'path', 'status', 'transcription', 'whisper_tier', 'confidence_level', 'confidence_score',
+    'is_correct', 'answer_confidence', 'similarity_score', 'feedback', 'error', 'seconds'
+]
+
+_options = None
+
+
+def parse_answers(value):
+    if not value:
+        return []
+    if isinstance(value, list):
+        return value
+    if value.lstrip().startswith('['):
+        return json.loads(value)
+    return [value]
+
+
+def load_items(source):
+    """
+    (id, path, actual_answers) for every recording of a directory or manifest
+    """
+    if os.path.isdir(source):
+        items = []
+        for root, _, files in os.walk(source):
+            for name in sorted(files):
+                if os.path.splitext(name)[1].lower() in AUDIO_EXTENSIONS:
+                    path = os.path.join(root, name)
+                    items.append({'id': os.path.relpath(path, source), 'path': path, 'actual_answers': []})
+        return sorted(items, key=lambda item: item['id'])
+
+    base_dir = os.path.dirname(os.path.abspath(source))
+    with open(source, newline='', encoding='utf-8') as f:
+        if source.endswith('.jsonl'):
+            rows = [json.loads(line) for line in f if line.strip()]
+        else:
+            rows = list(csv.DictReader(f))
+
+    items = []
+    for row in rows:
+        if not row.get('path'):
+            raise ValueError(f"Manifest row without a path: {row}")
+        items.append({
+            'id': str(row.get('id') or row['path']),
+            'path': os.path.join(base_dir, row['path']),
+            'actual_answers': parse_answers(row.get('actual_answer'))
+        })
+    return items
+
+
+def read_checkpoint(output):
+    """
+    Ids already written to the output with status "ok"
+    """
+    if not os.path.exists(output):
+        return set()
+    with open(output, newline='', encoding='utf-8') as f:
+        if output.endswith('.csv'):
+            rows = list(csv.DictReader(f))
+        else:
+            rows = []
+            for line in f:
+                try:
+                    rows.append(json.loads(line))
+                except ValueError:
+                    # A line cut off by an interrupted run
+                    continue
+    # Later rows win, a retried recording may appear twice
+    status = {row['id']: row.get('status') for row in rows if 'id' in row}
+    return {item_id for item_id, item_status in status.items() if item_status == 'ok'}
+
+
+def drop_partial_record(path, terminator, chunk_size=65536):
+    """
+    Truncate a record cut off by an interrupted run, so the next one is not appended to it
+    """
+    with open(path, 'rb+') as f:
+        end = f.seek(0, os.SEEK_END)
+        position = end
+        tail = b''
+        while position > 0:
+            position = max(0, position - chunk_size)
+            f.seek(position)
+            tail = f.read(end - position)
+            if tail.endswith(terminator):
+                return
+            index = tail.rfind(terminator)
+            if index >= 0:
+                f.truncate(position + index + len(terminator))
+                return
+        # Not even one complete record
+        f.truncate(0)
+
+
+def csv_row(record):
+    prediction = record.get('prediction') or {}
+    comparison = record.get('comparison') or {}
+    return {
+        'id': record['id'],
+        'path': record['path'],
+        'status': record['status'],
+        'transcription': record.get('transcription'),
+        'whisper_tier': record.get('whisper_tier'),
+        'confidence_level': prediction.get('confidence_level'),
+        'confidence_score': prediction.get('confidence_score'),
+        'is_correct': comparison.get('is_correct'),
+        'answer_confidence': comparison.get('confidence'),
+        'similarity_score': comparison.get('similarity_scores'),
+        'feedback': comparison.get('feedback'),
+        'error': record.get('error') or prediction.get('error') or comparison.get('error'),
+        'seconds': record['seconds']
+    }
+
+
+def init_worker(options, threads):
+    global _options
+    _options = options
+    os.environ['WARMUP_MODELS'] = 'none'
+    # Pool workers are daemonic and cannot start the chunked mode's own process pool,
+    # chunks are transcribed in the worker with its Whisper model instead
+    os.environ['TRANSCRIBE_PROCESSES'] = '0'
+
+    import torch
+    torch.set_num_threads(threads)
+    # Imported here so only the workers load models, once each
+    import app  # noqa: F401
+
+
+def process_item(item):
+    import app
+
+    start = time.perf_counter()
+    record = {'id': item['id'], 'path': item['path']}
+    try:
+        with open(item['path'], 'rb') as f:
+            audio, sr = app.decode_audio(f.read())
+
+        if item['actual_answers']:
+            result = app.analyze_answer_audio(
+                audio, sr, item['actual_answers'],
+                transcribe_mode=_options['mode'],
+                quality=_options['quality']
+            )
+            result.pop('success', None)
+            record.update(result)
+        else:
+            tier = app.choose_whisper_tier(len(audio) / sr, _options['quality'])
+            record['transcription'] = app.run_whisper(app.to_whisper_input(audio, sr), _options['mode'], tier)['text']
+            record['whisper_tier'] = tier
+            record['prediction'] = app.predict_confidence(app.preprocess_audio(audio, sr))[0]
+        record['status'] = 'ok'
+    except Exception as e:
+        record['status'] = 'error'
+        record['error'] = str(e)
+    record['seconds'] = round(time.perf_counter() - start, 3)
+    return record
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('source', help='directory of recordings, or a .csv / .jsonl manifest')
+    parser.add_argument('--output', required=True, help='results file, .jsonl or .csv')
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 1) // 2),
+                        help='worker processes, each loads its own models')
+    parser.add_argument('--mode', choices=['full', 'chunked'], help='Whisper mode, TRANSCRIBE_MODE by default')
+    parser.add_argument('--quality', help='Whisper tier hint: fast, accurate or a WHISPER_TIERS name')
+    parser.add_argument('--restart', action='store_true', help='discard existing results instead of resuming')
+    args = parser.parse_args()
+
+    items = load_items(args.source)
+    if args.restart and os.path.exists(args.output):
+        os.remove(args.output)
+    if os.path.exists(args.output):
+        # Before the checkpoint is read: a cut-off row could look like a finished one.
+        # csv writes \r\n after each row, a field may hold a bare \n
+        drop_partial_record(args.output, b'\r\n' if args.output.endswith('.csv') else b'\n')
+    done = read_checkpoint(args.output)
+    todo = [item for item in items if item['id'] not in done]
+    # Longest recordings first so the pool does not end waiting on one big file
+    todo.sort(key=lambda item: os.path.getsize(item['path']) if os.path.exists(item['path']) else 0, reverse=True)
+    print(f"{len(items)} recordings, {len(items) - len(todo)} already done, {len(todo)} to process", file=sys.stderr)
+    if not todo:
+        return 0
+
+    is_csv = args.output.endswith('.csv')
+    write_header = is_csv and not (os.path.exists(args.output) and os.path.getsize(args.output))
+    options = {'mode': args.mode, 'quality': args.quality}
+    threads = max(1, (os.cpu_count() or 1) // args.workers)
+
+    failed = 0
+    started = time.perf_counter()
+    # spawn: workers must not inherit a half-initialised torch from the parent
+    context = multiprocessing.get_context('spawn')
+    with open(args.output, 'a', newline='', encoding='utf-8') as out, \
+            context.Pool(args.workers, initializer=init_worker, initargs=(options, threads)) as pool:
+        writer = csv.DictWriter(out, fieldnames=CSV_COLUMNS) if is_csv else None
+        if write_header:
+            writer.writeheader()
+
+        for count, record in enumerate(pool.imap_unordered(process_item, todo), 1):
+            if is_csv:
+                writer.writerow(csv_row(record))
+            else:
+                out.write(json.dumps(record) + '\n')
+            # Every finished recording is on disk before the next one is reported
+            out.flush()
+            os.fsync(out.fileno())
+
+            if record['status'] != 'ok':
+                failed += 1
+                print(f"{record['id']}: {record['error']}", file=sys.stderr)
+            elapsed = time.perf_counter() - started
+            print(f"[{count}/{len(todo)}] {record['id']} {record['seconds']}s ({count / elapsed:.2f} recordings/s)",
+                  file=sys.stderr)
+
+    print(f"Finished: {len(todo) - failed} ok, {failed} failed", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,223 @@
+"""
+Stage-level micro-benchmarks for the voice-confidence service.
+
+    python benchmark.py run [--repeat 5] [--stages preprocess_audio,whisper_transcribe] [--output run.json]
+    python benchmark.py compare baseline.json candidate.json [--threshold 0.10]
+
+"run" times each pipeline stage on synthetic audio (tone + noise of several
+lengths) and a fixed corpus of answer/reference pairs, and prints p50/p95
+latency in milliseconds plus how far the process RSS rose above its level
+before the stage (sampled while the stage runs, first call included) as JSON.
+"compare" reports the relative change per stage and exits with status 1 if
+any p50 or p95 got slower by more than the threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import threading
+import time
+
+import numpy as np
+
+os.environ.setdefault('WARMUP_MODELS', 'none')
+
+import app  # noqa: E402
+from model_registry import MB, current_rss_bytes  # noqa: E402
+
+
+AUDIO_SECONDS = [5, 30, 120]
+UPLOAD_SAMPLE_RATE = 44100
+
+CORPUS = [
+    ("Polymorphism lets objects of different classes be used through the same interface.",
+     "Polymorphism allows different classes to be treated as instances of a common parent class."),
+    ("A primary key uniquely identifies each row in a table.",
+     "A primary key is a column that uniquely identifies every record in a database table."),
+    ("I would talk to my teammate privately and try to understand the problem first.",
+     "Address the conflict directly and privately, listen to the colleague and agree on a solution."),
+    ("REST uses HTTP verbs like GET and POST on resources identified by URLs.",
+     "REST is an architectural style where resources are accessed with standard HTTP methods."),
+    ("Garbage collection frees memory that is no longer referenced by the program.",
+     "The garbage collector automatically reclaims memory of objects that are unreachable."),
+    ("An index speeds up lookups at the cost of slower writes and extra storage.",
+     "Database indexes make reads faster but add overhead to inserts and updates."),
+]
+
+
+def synthetic_audio(seconds, sr, seed=0):
+    """
+    Speech-like test signal: a gliding harmonic tone with bursts and background noise
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sr)) / sr
+    pitch = 140 + 40 * np.sin(2 * np.pi * 0.5 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / sr
+    voice = sum(np.sin(k * phase) / k for k in range(1, 6))
+    envelope = (np.sin(2 * np.pi * 1.5 * t) > -0.3).astype(np.float64)
+    audio = 0.3 * voice * envelope + 0.02 * rng.standard_normal(len(t))
+    return audio.astype(np.float32)
+
+
+class RssSampler:
+    """
+    Highest RSS seen while the block runs, relative to the RSS when it started.
+
+    ru_maxrss is the high-water mark of the whole process, so every stage
+    after the largest one would report that stage's peak; sampling from a
+    thread attributes each rise to the stage that caused it.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.delta_mb = None
+        self._stop = threading.Event()
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self._peak = max(self._peak, current_rss_bytes())
+
+    def __enter__(self):
+        self._start = current_rss_bytes()
+        if self._start is not None:
+            self._peak = self._start
+            self._thread = threading.Thread(target=self._sample, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        if self._start is not None:
+            self._stop.set()
+            self._thread.join()
+            self._peak = max(self._peak, current_rss_bytes())
+            self.delta_mb = round((self._peak - self._start) / MB, 1)
+
+
+def build_stages():
+    audio_16k = {s: synthetic_audio(s, app.WHISPER_SAMPLE_RATE) for s in AUDIO_SECONDS}
+    audio_upload = {s: synthetic_audio(s, UPLOAD_SAMPLE_RATE) for s in AUDIO_SECONDS}
+    candidates = [candidate for candidate, _ in CORPUS]
+    references = [reference for _, reference in CORPUS]
+
+    def paraphrases(text):
+        # Measure generation, not the paraphrase cache
+        app.paraphrase_cache.clear()
+        return app.generate_paraphrases(text)
+
+    stages = {}
+    for seconds in AUDIO_SECONDS:
+        stages[f'preprocess_audio_{seconds}s'] = (
+            lambda s=seconds: app.preprocess_audio(audio_upload[s], UPLOAD_SAMPLE_RATE)
+        )
+        stages[f'whisper_transcribe_{seconds}s'] = (
+            lambda s=seconds: app.models.get('whisper').transcribe(audio_16k[s], fp16=False)
+        )
+    stages['preprocess_text'] = lambda: [app.preprocess_text(text) for text in candidates + references]
+    stages['generate_paraphrases'] = lambda: paraphrases(candidates[0])
+    stages['get_semantic_similarity'] = lambda: [app.get_semantic_similarity(c, r) for c, r in CORPUS]
+    stages['extract_key_information'] = lambda: [app.extract_key_information(text) for text in candidates + references]
+    return stages
+
+
+def run(args):
+    stages = build_stages()
+    if args.stages:
+        wanted = args.stages.split(',')
+        stages = {name: fn for name, fn in stages.items() if any(name.startswith(w) for w in wanted)}
+
+    results = {}
+    for name, fn in stages.items():
+        with RssSampler() as rss:
+            # First call loads models and warms caches, it is not timed
+            fn()
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                fn()
+                timings.append((time.perf_counter() - start) * 1000)
+        results[name] = {
+            'p50_ms': round(float(np.percentile(timings, 50)), 2),
+            'p95_ms': round(float(np.percentile(timings, 95)), 2),
+            'runs': args.repeat,
+            'rss_delta_mb': rss.delta_mb
+        }
+        print(f"{name}: p50 {results[name]['p50_ms']} ms, p95 {results[name]['p95_ms']} ms", file=sys.stderr)
+
+    report = {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'machine': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count()
+        },
+        'config': {
+            'inference_backend': app.INFERENCE_BACKEND,
+            'whisper_model': app.WHISPER_MODEL_NAME,
+            'feature_sample_rate': app.FEATURE_SAMPLE_RATE,
+            'feature_extraction': app.FEATURE_EXTRACTION
+        },
+        'stages': results
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    print(output)
+    return 0
+
+
+def compare(args):
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)['stages']
+    with open(args.candidate, encoding='utf-8') as f:
+        candidate = json.load(f)['stages']
+
+    report = {}
+    regressions = []
+    for name in sorted(set(baseline) & set(candidate)):
+        entry = {}
+        for metric in ('p50_ms', 'p95_ms', 'rss_delta_mb'):
+            before, after = baseline[name].get(metric), candidate[name].get(metric)
+            if before is None or after is None:
+                # Reports from before rss_delta_mb, or from a platform without /proc
+                continue
+            change = (after - before) / before if before else 0.0
+            entry[metric] = {'baseline': before, 'candidate': after, 'change': round(change, 4)}
+            if metric != 'rss_delta_mb' and change > args.threshold:
+                regressions.append(f'{name}.{metric}')
+        report[name] = entry
+
+    print(json.dumps({
+        'threshold': args.threshold,
+        'stages': report,
+        'regressions': regressions,
+        'missing_in_candidate': sorted(set(baseline) - set(candidate))
+    }, indent=2))
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='time every stage and print a JSON report')
+    run_parser.add_argument('--repeat', type=int, default=5)
+    run_parser.add_argument('--stages', help='comma separated stage name prefixes to run')
+    run_parser.add_argument('--output', help='also write the JSON report to this file')
+    run_parser.set_defaults(func=run)
+
+    compare_parser = subparsers.add_parser('compare', help='compare two reports and flag regressions')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('candidate')
+    compare_parser.add_argument('--threshold', type=float, default=0.10,
+                                help='relative slowdown that counts as a regression')
+    compare_parser.set_defaults(func=compare)
+
+    args = parser.parse_args()
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
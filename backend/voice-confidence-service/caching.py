@@ -0,0 +1,248 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+
+# Bytes read at a time when hashing an uploaded file
+HASH_CHUNK_BYTES = 1024 * 1024
+
+
+class LRUCache:
+    """
+    Small thread-safe LRU mapping shared by the request threads of one process.
+    With ttl (seconds) entries also expire that long after they were stored.
+    """
+
+    def __init__(self, maxsize, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _live(self, key):
+        # Called with the lock held; drops the entry if it has expired
+        if key not in self._data:
+            return False
+        expires_at = self._data[key][1]
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return False
+        return True
+
+    def get(self, key, default=None):
+        with self._lock:
+            if not self._live(key):
+                return default
+            self._data.move_to_end(key)
+            return self._data[key][0]
+
+    def put(self, key, value):
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __contains__(self, key):
+        with self._lock:
+            return self._live(key)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class _Flight:
+    __slots__ = ('done', 'value', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key: the first caller runs the
+    function and every caller that arrives while it runs gets its result
+    (or its exception) instead of running it again
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = fn()
+            return flight.value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._flights)
+
+
+class DiskCache:
+    """
+    JSON results stored one file per key, shared by every worker process using the same directory.
+    The oldest files are removed once the directory grows past max_bytes.
+
+    Writes add to a per-process estimate of the directory size; the directory
+    is only scanned when that estimate passes max_bytes or every scan_every
+    writes (to see what other processes wrote), and eviction then goes down
+    to low_water of max_bytes so the next scan is many writes away.
+    """
+
+    def __init__(self, directory, max_bytes, scan_every=256, low_water=0.9):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.scan_every = scan_every
+        self.low_water = low_water
+        self._size_estimate = None
+        self._writes_since_scan = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'{key}.json')
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                value = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        # Touch so eviction keeps recently used entries
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return value
+
+    def put(self, key, value):
+        path = self._path(key)
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(value, f)
+            written = f.tell()
+        try:
+            replaced = os.path.getsize(path)
+        except OSError:
+            replaced = 0
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._writes_since_scan += 1
+            if self._size_estimate is not None:
+                self._size_estimate += written - replaced
+            scan = (
+                self._size_estimate is None
+                or self._size_estimate > self.max_bytes
+                or self._writes_since_scan >= self.scan_every
+            )
+            if scan:
+                self._writes_since_scan = 0
+        if scan:
+            self._evict()
+
+    def _evict(self):
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.json'):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    # Removed by another process since the listing
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        if total > self.max_bytes:
+            target = self.max_bytes * self.low_water
+            for _, size, path in sorted(entries):
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                total -= size
+        with self._lock:
+            self._size_estimate = total
+
+
+class ResultCache:
+    """
+    Content-addressed results: a per-process LRU in front of an optional shared DiskCache
+    """
+
+    def __init__(self, maxsize, directory=None, max_disk_bytes=256 * 1024 * 1024):
+        self.memory = LRUCache(maxsize)
+        self.disk = DiskCache(directory, max_disk_bytes) if directory else None
+
+    @staticmethod
+    def key(data, *versions):
+        """
+        SHA-256 of the content plus every model/version identifier the result depends on
+        """
+        return ResultCache._versioned(hashlib.sha256(data), versions)
+
+    @staticmethod
+    def key_file(f, *versions):
+        """
+        ResultCache.key of a seekable binary file's content, read in chunks and rewound afterwards
+        """
+        digest = hashlib.sha256()
+        f.seek(0)
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b''):
+            digest.update(chunk)
+        f.seek(0)
+        return ResultCache._versioned(digest, versions)
+
+    @staticmethod
+    def _versioned(digest, versions):
+        for version in versions:
+            digest.update(b'\0' + str(version).encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                self.memory.put(key, value)
+        return value
+
+    def put(self, key, value):
+        self.memory.put(key, value)
+        if self.disk is not None:
+            self.disk.put(key, value)
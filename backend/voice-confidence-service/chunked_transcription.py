@@ -0,0 +1,149 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+
+# Energy VAD settings
+FRAME_SECONDS = 0.03
+SILENCE_THRESHOLD_DB = -40.0
+MIN_PAUSE_SECONDS = 0.6
+PADDING_SECONDS = 0.2
+
+# Chunks are grown from speech regions up to roughly one Whisper window
+TARGET_CHUNK_SECONDS = 30.0
+
+_worker_model = None
+
+
+def detect_speech_regions(audio, sr, threshold_db=SILENCE_THRESHOLD_DB, min_pause=MIN_PAUSE_SECONDS):
+    """
+    (start, end) sample ranges that contain speech, by frame RMS relative to the loudest frame.
+    Pauses shorter than min_pause are kept inside a region.
+    """
+    frame = max(1, int(FRAME_SECONDS * sr))
+    n_frames = len(audio) // frame
+    if n_frames == 0:
+        return [(0, len(audio))] if len(audio) else []
+
+    frames = audio[:n_frames * frame].reshape(n_frames, frame)
+    rms = np.sqrt(np.mean(frames.astype(np.float64) ** 2, axis=1))
+    peak = rms.max()
+    if peak == 0:
+        return []
+
+    voiced = 20 * np.log10(np.maximum(rms, 1e-10) / peak) > threshold_db
+    edges = np.flatnonzero(np.diff(np.concatenate([[0], voiced.astype(np.int8), [0]])))
+    regions = list(zip(edges[::2] * frame, edges[1::2] * frame))
+
+    merged = []
+    max_gap = int(min_pause * sr)
+    for start, end in regions:
+        if merged and start - merged[-1][1] < max_gap:
+            merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+
+    padding = int(PADDING_SECONDS * sr)
+    return [(max(0, start - padding), min(len(audio), end + padding)) for start, end in merged]
+
+
+def plan_chunks(regions, sr, target_seconds=TARGET_CHUNK_SECONDS):
+    """
+    Group consecutive speech regions into chunks of about target_seconds, splitting at pauses.
+    Silence between chunks is dropped; a single longer region stays whole.
+    """
+    chunks = []
+    limit = int(target_seconds * sr)
+    for start, end in regions:
+        if chunks and end - chunks[-1][0] <= limit:
+            chunks[-1] = (chunks[-1][0], end)
+        else:
+            chunks.append((start, end))
+    return chunks
+
+
+def _init_worker(model_name, threads):
+    global _worker_model
+    import torch
+    import whisper
+    torch.set_num_threads(threads)
+    _worker_model = whisper.load_model(model_name)
+
+
+def _transcribe_chunk(chunk, offset, model=None):
+    result = (model or _worker_model).transcribe(chunk, fp16=False)
+    segments = [
+        {
+            'start': round(offset + segment['start'], 2),
+            'end': round(offset + segment['end'], 2),
+            'text': segment['text']
+        }
+        for segment in result['segments']
+    ]
+    return result['text'], segments
+
+
+class ChunkedTranscriber:
+    """
+    Drops dead air, splits a recording at pauses and transcribes the chunks in parallel.
+    Every pool process loads its own Whisper model once.
+
+    processes=0 transcribes the chunks one after another in the calling
+    process with model_loader()'s model, for callers that are pool workers
+    themselves and may not start processes of their own.
+    """
+
+    def __init__(self, model_name, processes=2, sr=16000, model_loader=None):
+        if processes == 0 and model_loader is None:
+            raise ValueError("In-process chunked transcription needs a model_loader")
+        self.model_name = model_name
+        self.processes = processes
+        self.sr = sr
+        self.model_loader = model_loader
+        self._pool = None
+
+    def _get_pool(self):
+        if self._pool is None:
+            threads = max(1, (os.cpu_count() or 1) // self.processes)
+            # spawn: a forked child would inherit torch's thread pools and locks from the parent
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.processes,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(self.model_name, threads)
+            )
+        return self._pool
+
+    def transcribe(self, audio):
+        """
+        Same shape as whisper's transcribe: {'text', 'segments'} with timestamps in the original recording
+        """
+        chunks = plan_chunks(detect_speech_regions(audio, self.sr), self.sr)
+        if not chunks:
+            return {'text': '', 'segments': []}
+
+        if self.processes == 0:
+            model = self.model_loader()
+            transcribed = [
+                _transcribe_chunk(audio[start:end], start / self.sr, model)
+                for start, end in chunks
+            ]
+        else:
+            pool = self._get_pool()
+            futures = [
+                pool.submit(_transcribe_chunk, audio[start:end], start / self.sr)
+                for start, end in chunks
+            ]
+            transcribed = [future.result() for future in futures]
+
+        texts, segments = [], []
+        for text, chunk_segments in transcribed:
+            texts.append(text.strip())
+            segments.extend(chunk_segments)
+
+        return {
+            'text': ' '.join(text for text in texts if text),
+            'segments': segments
+        }
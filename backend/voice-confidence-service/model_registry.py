@@ -0,0 +1,188 @@
+import gc
+import logging
+import os
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+
+def current_rss_bytes():
+    """
+    Resident set size of this process, None where /proc is not available
+    """
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class ModelRegistry:
+    """
+    Loads models on first use (or in a background warm-up) instead of at import time.
+
+    Each model is registered with a loader and an optional warm-up callable
+    that runs one tiny inference so the first real request does not pay for
+    lazy initialisation inside the framework.
+
+    With a memory budget (MB, measured as the RSS growth while each model
+    loads) the least recently used models are evicted once the resident ones
+    exceed it; with idle_seconds, models unused for that long are evicted as
+    well. Evicted models are reloaded on their next get().
+    """
+
+    def __init__(self, memory_budget_mb=0, idle_seconds=0):
+        self.memory_budget = int(memory_budget_mb * MB)
+        self.idle_seconds = idle_seconds
+        self._loaders = {}
+        self._warmups = {}
+        self._models = {}
+        self._locks = {}
+        self._warmed = set()
+        self._load_seconds = {}
+        self._errors = {}
+        self._sizes = {}
+        self._last_used = {}
+        self._loads = {}
+        self._evictions = {}
+        self._eviction_lock = threading.Lock()
+
+    def register(self, name, loader, warmup=None):
+        self._loaders[name] = loader
+        self._warmups[name] = warmup
+        self._locks[name] = threading.Lock()
+        self._loads[name] = 0
+        self._evictions[name] = 0
+
+    def get(self, name):
+        self._last_used[name] = time.time()
+        model = self._models.get(name)
+        if model is not None:
+            self._evict_idle(keep=name)
+            return model
+
+        with self._locks[name]:
+            model = self._models.get(name)
+            if model is None:
+                rss_before = current_rss_bytes()
+                start = time.perf_counter()
+                try:
+                    model = self._loaders[name]()
+                except Exception as e:
+                    self._errors[name] = str(e)
+                    logger.error(f"Failed to load model {name}: {str(e)}")
+                    raise
+                self._load_seconds[name] = time.perf_counter() - start
+                rss_after = current_rss_bytes()
+                if rss_before is not None and rss_after is not None:
+                    self._sizes[name] = max(rss_after - rss_before, 0)
+                self._loads[name] += 1
+                self._errors.pop(name, None)
+                self._models[name] = model
+                logger.info(f"Loaded model {name} in {self._load_seconds[name]:.1f}s")
+
+        # Outside the per-model lock so two loading threads never wait on each other
+        self._evict_idle(keep=name)
+        self._enforce_budget(keep=name)
+        return model
+
+    def _evict(self, name, reason):
+        # A model another thread is loading right now is skipped, not waited for
+        if not self._locks[name].acquire(blocking=False):
+            return False
+        try:
+            if self._models.pop(name, None) is None:
+                return False
+            self._evictions[name] += 1
+        finally:
+            self._locks[name].release()
+        # Requests still holding the model keep it alive until they finish
+        gc.collect()
+        logger.info(f"Evicted model {name} ({reason})")
+        return True
+
+    def _evict_idle(self, keep):
+        if not self.idle_seconds:
+            return
+        cutoff = time.time() - self.idle_seconds
+        for name in list(self._models):
+            if name != keep and self._last_used.get(name, 0) < cutoff:
+                self._evict(name, 'idle')
+
+    def _enforce_budget(self, keep):
+        if not self.memory_budget:
+            return
+        with self._eviction_lock:
+            candidates = sorted(
+                (name for name in list(self._models) if name != keep),
+                key=lambda name: self._last_used.get(name, 0)
+            )
+            while candidates and self.resident_bytes() > self.memory_budget:
+                self._evict(candidates.pop(0), 'memory budget')
+
+    def resident_bytes(self):
+        return sum(self._sizes.get(name, 0) for name in list(self._models))
+
+    def unload(self, name):
+        """
+        Drop a loaded model so the next get() loads it again with the current loader
+        """
+        with self._locks[name]:
+            self._models.pop(name, None)
+            self._warmed.discard(name)
+            self._load_seconds.pop(name, None)
+            self._sizes.pop(name, None)
+
+    def warm_up(self, names=None):
+        """
+        Load and exercise the given models (all registered ones by default)
+        """
+        for name in names or list(self._loaders):
+            if name in self._warmed:
+                continue
+            try:
+                model = self.get(name)
+                if self._warmups[name] is not None:
+                    self._warmups[name](model)
+                self._warmed.add(name)
+            except Exception as e:
+                self._errors[name] = str(e)
+                logger.error(f"Warm-up failed for model {name}: {str(e)}")
+
+    def warm_up_in_background(self, names=None):
+        thread = threading.Thread(target=self.warm_up, args=(names,), name='model-warmup', daemon=True)
+        thread.start()
+        return thread
+
+    def is_ready(self, names=None):
+        # Evicted models stay warmed: the process has shown it can load them
+        return all(name in self._warmed for name in (self._loaders if names is None else names))
+
+    def status(self):
+        return {
+            name: {
+                'loaded': name in self._models,
+                'warmed': name in self._warmed,
+                'load_seconds': round(self._load_seconds[name], 3) if name in self._load_seconds else None,
+                'size_mb': round(self._sizes[name] / MB, 1) if name in self._sizes else None,
+                'last_used': round(self._last_used[name], 3) if name in self._last_used else None,
+                'loads': self._loads[name],
+                'evictions': self._evictions[name],
+                'error': self._errors.get(name)
+            }
+            for name in self._loaders
+        }
+
+    def residency(self):
+        rss = current_rss_bytes()
+        return {
+            'memory_budget_mb': round(self.memory_budget / MB, 1) if self.memory_budget else None,
+            'idle_seconds': self.idle_seconds or None,
+            'resident_mb': round(self.resident_bytes() / MB, 1),
+            'process_rss_mb': round(rss / MB, 1) if rss is not None else None,
+            'models': self.status()
+        }
@@ -0,0 +1,70 @@
+import logging
+import os
+
+
+logger = logging.getLogger(__name__)
+
+
+# Dynamic int8 quantization config for x86 CPUs ("avx2", "avx512", "avx512_vnni" or "arm64")
+ONNX_QUANTIZATION = os.environ.get('ONNX_QUANTIZATION', 'avx2')
+
+
+def _safe_name(model_name):
+    return model_name.replace('/', '__')
+
+
+def load_sentence_model(model_name, cache_dir):
+    """
+    SentenceTransformer running a dynamically int8-quantized ONNX export through ONNX Runtime.
+    The export and quantization happen once and are reused from cache_dir.
+    """
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+    model_dir = os.path.join(cache_dir, _safe_name(model_name))
+    file_name = f'model_qint8_{ONNX_QUANTIZATION}.onnx'
+    quantized_path = os.path.join(model_dir, 'onnx', file_name)
+
+    if not os.path.exists(quantized_path):
+        logger.info(f"Exporting {model_name} to quantized ONNX in {model_dir}")
+        model = SentenceTransformer(model_name, backend='onnx')
+        model.save_pretrained(model_dir)
+        export_dynamic_quantized_onnx_model(model, ONNX_QUANTIZATION, model_dir)
+
+    return SentenceTransformer(
+        model_dir,
+        backend='onnx',
+        model_kwargs={'file_name': f'onnx/{file_name}'}
+    )
+
+
+def load_t5_model(model_name, cache_dir):
+    """
+    (tokenizer, model) pair for T5 with int8-quantized encoder and decoders on ONNX Runtime.
+    The returned model supports the same generate() call as the PyTorch one.
+    """
+    from transformers import T5Tokenizer
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+
+    model_dir = os.path.join(cache_dir, _safe_name(model_name))
+    quantized_dir = os.path.join(model_dir, f'qint8_{ONNX_QUANTIZATION}')
+
+    if not os.path.isdir(quantized_dir):
+        logger.info(f"Exporting {model_name} to quantized ONNX in {model_dir}")
+        ORTModelForSeq2SeqLM.from_pretrained(model_name, export=True).save_pretrained(model_dir)
+
+        qconfig = getattr(AutoQuantizationConfig, ONNX_QUANTIZATION)(is_static=False, per_channel=False)
+        for onnx_file in sorted(os.listdir(model_dir)):
+            if onnx_file.endswith('.onnx'):
+                quantizer = ORTQuantizer.from_pretrained(model_dir, file_name=onnx_file)
+                quantizer.quantize(save_dir=quantized_dir, quantization_config=qconfig)
+
+    return (
+        T5Tokenizer.from_pretrained(model_name),
+        ORTModelForSeq2SeqLM.from_pretrained(
+            quantized_dir,
+            encoder_file_name='encoder_model_quantized.onnx',
+            decoder_file_name='decoder_model_quantized.onnx',
+            decoder_with_past_file_name='decoder_with_past_model_quantized.onnx'
+        )
+    )
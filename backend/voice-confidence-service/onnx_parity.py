@@ -0,0 +1,98 @@
+"""
+Compare /compare scores of the ONNX Runtime backend against the PyTorch one.
+
+    python onnx_parity.py [--tolerance 0.02]
+
+Paraphrases are generated once with PyTorch T5 and reused for both backends,
+so score differences come only from SentenceTransformer inference. The T5
+export is checked separately by scoring each backend's own paraphrases.
+Exits with status 1 when any fixed-paraphrase score differs by more than
+the tolerance.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+os.environ.setdefault('WARMUP_MODELS', 'none')
+
+import app  # noqa: E402
+from reference_store import ReferenceStore  # noqa: E402
+
+
+PAIRS = [
+    ("Polymorphism lets objects of different classes be used through the same interface.",
+     ["Polymorphism allows different classes to be treated as instances of a common parent class."]),
+    ("A primary key uniquely identifies each row in a table.",
+     ["A primary key is a column that uniquely identifies every record in a database table."]),
+    ("I would talk to my teammate privately and try to understand the problem first.",
+     ["Address the conflict directly and privately, listen to the colleague and agree on a solution."]),
+    ("REST uses HTTP verbs like GET and POST on resources identified by URLs.",
+     ["REST is an architectural style where resources are accessed with standard HTTP methods."]),
+    ("Garbage collection frees memory that is no longer referenced.",
+     ["The garbage collector automatically reclaims memory of objects that are unreachable.",
+      "Automatic memory management that deletes unused objects."]),
+    ("I like football and cooking.",
+     ["A deadlock happens when two threads each wait for a lock held by the other."]),
+]
+
+
+def use_backend(backend, store_dir):
+    app.INFERENCE_BACKEND = backend
+    app.models.unload('sentence')
+    app.models.unload('t5')
+    app.reference_store = ReferenceStore(
+        os.path.join(store_dir, backend),
+        app.analyze_references,
+        model_version=app.reference_model_version(backend=backend)
+    )
+
+
+def score(comparisons):
+    return [result['similarity_score'] for result in app.score_comparisons(comparisons, cascade=False)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tolerance', type=float, default=0.02)
+    args = parser.parse_args()
+
+    report = {}
+    with tempfile.TemporaryDirectory() as store_dir:
+        # Fixed paraphrases: PyTorch T5 fills the paraphrase cache used by both backends
+        use_backend('torch', store_dir)
+        torch_scores = score(PAIRS)
+        use_backend('onnx', store_dir)
+        onnx_scores = score(PAIRS)
+
+        # Each backend's own paraphrases
+        app.paraphrase_cache.clear()
+        onnx_own_scores = score(PAIRS)
+
+    fixed_diffs = [abs(a - b) for a, b in zip(torch_scores, onnx_scores)]
+    own_diffs = [abs(a - b) for a, b in zip(torch_scores, onnx_own_scores)]
+    report['pairs'] = [
+        {
+            'candidate_answer': candidate,
+            'torch': round(t, 4),
+            'onnx_fixed_paraphrases': round(o, 4),
+            'onnx_own_paraphrases': round(p, 4)
+        }
+        for (candidate, _), t, o, p in zip(PAIRS, torch_scores, onnx_scores, onnx_own_scores)
+    ]
+    report['max_abs_diff_fixed_paraphrases'] = round(max(fixed_diffs), 4)
+    report['max_abs_diff_own_paraphrases'] = round(max(own_diffs), 4)
+    report['verdicts_changed'] = sum(
+        app.build_comparison_result(t, None)['confidence'] != app.build_comparison_result(o, None)['confidence']
+        for t, o in zip(torch_scores, onnx_scores)
+    )
+    report['tolerance'] = args.tolerance
+    report['passed'] = report['max_abs_diff_fixed_paraphrases'] <= args.tolerance
+
+    print(json.dumps(report, indent=2))
+    return 0 if report['passed'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
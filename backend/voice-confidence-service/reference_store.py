@@ -0,0 +1,225 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import uuid
+
+import numpy as np
+
+from caching import LRUCache
+from text_analysis import TextAnalysis
+
+try:
+    import fcntl
+except ImportError:  # Windows development machines
+    fcntl = None
+
+
+logger = logging.getLogger(__name__)
+
+
+def answer_key(answer):
+    """
+    Hash of the exact reference answer used as its store key.
+    Its analysis depends on case and spacing (spaCy detects entities on the
+    cased text), so answers differing only in those get their own entries.
+    """
+    return hashlib.sha256(answer.encode('utf-8')).hexdigest()
+
+
+class ReferenceStore:
+    """
+    Precomputed reference-answer features persisted on disk.
+
+    SBERT and spaCy document vectors live in memory-mapped .npy files so every
+    worker process shares the same pages; the normalized text and key
+    information of each answer live in index.json next to them.
+
+    Only register() persists answers. Answers a comparison brings that were
+    never registered are analyzed on the fly and kept in a per-process LRU of
+    transient_size entries, so arbitrary payloads neither grow the store nor
+    rewrite it.
+    """
+
+    def __init__(self, directory, analyzer, model_version, transient_size=1024):
+        # analyzer(answers) -> [TextAnalysis, ...] with embeddings set
+        self.directory = directory
+        self.analyzer = analyzer
+        self.model_version = model_version
+        self._transient = LRUCache(transient_size)
+        self.index_path = os.path.join(directory, 'index.json')
+        self._lock = threading.Lock()
+        self._index_mtime = None
+        self._entries = {}
+        self._questions = {}
+        self._sbert = None
+        self._spacy = None
+        os.makedirs(directory, exist_ok=True)
+
+    def _file_lock(self):
+        handle = open(os.path.join(self.directory, '.lock'), 'a')
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        return handle
+
+    def _refresh(self):
+        """
+        Reload the index and vector files if another process rewrote them
+        """
+        try:
+            mtime = os.stat(self.index_path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime == self._index_mtime:
+            return
+
+        with open(self.index_path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+
+        if index.get('model_version') != self.model_version:
+            logger.warning("Reference store was built with different models, ignoring it")
+            self._entries, self._questions = {}, {}
+            self._sbert = self._spacy = None
+        else:
+            try:
+                sbert = np.load(os.path.join(self.directory, index['sbert_file']), mmap_mode='r')
+                spacy = np.load(os.path.join(self.directory, index['spacy_file']), mmap_mode='r')
+            except FileNotFoundError:
+                # Another process replaced the store between our reads, pick up its index
+                return self._refresh()
+            self._entries = index['entries']
+            self._questions = index.get('questions', {})
+            self._sbert, self._spacy = sbert, spacy
+        self._index_mtime = mtime
+
+    def _write(self, entries, questions, sbert, spacy):
+        tag = uuid.uuid4().hex
+        sbert_file = f'sbert-{tag}.npy'
+        spacy_file = f'spacy-{tag}.npy'
+        np.save(os.path.join(self.directory, sbert_file), sbert)
+        np.save(os.path.join(self.directory, spacy_file), spacy)
+
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'model_version': self.model_version,
+                'sbert_file': sbert_file,
+                'spacy_file': spacy_file,
+                'entries': entries,
+                'questions': questions
+            }, f)
+        os.replace(tmp_path, self.index_path)
+
+        # Old vector files stay readable for processes that still map them
+        for name in os.listdir(self.directory):
+            if name.endswith('.npy') and name not in (sbert_file, spacy_file):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+
+    def _entry(self, key):
+        entry = self._entries[key]
+        return TextAnalysis(
+            text=entry['text'],
+            normalized=entry['normalized'],
+            vector=self._spacy[entry['row']],
+            embedding=self._sbert[entry['row']],
+            **entry['info']
+        )
+
+    def register(self, answers, question_id=None, refresh=False):
+        """
+        Analyze and persist reference answers, returning their store keys
+        """
+        keys = [answer_key(answer) for answer in answers]
+
+        with self._lock:
+            lock_handle = self._file_lock()
+            try:
+                self._refresh()
+                pending = {
+                    key: answer for key, answer in zip(keys, answers)
+                    if refresh or key not in self._entries
+                }
+
+                if pending or question_id is not None:
+                    entries = dict(self._entries)
+                    sbert_rows = list(self._sbert) if self._sbert is not None else []
+                    spacy_rows = list(self._spacy) if self._spacy is not None else []
+
+                    analyzed = self.analyzer(list(pending.values())) if pending else []
+                    for key, analysis in zip(pending, analyzed):
+                        if key in entries:
+                            row = entries[key]['row']
+                            sbert_rows[row] = analysis.embedding
+                            spacy_rows[row] = analysis.vector
+                        else:
+                            row = len(sbert_rows)
+                            sbert_rows.append(analysis.embedding)
+                            spacy_rows.append(analysis.vector)
+                        entries[key] = {
+                            'row': row,
+                            'text': analysis.text,
+                            'normalized': analysis.normalized,
+                            'info': analysis.info
+                        }
+
+                    questions = dict(self._questions)
+                    if question_id is not None:
+                        questions[str(question_id)] = keys
+
+                    self._write(
+                        entries,
+                        questions,
+                        np.asarray(sbert_rows, dtype=np.float32),
+                        np.asarray(spacy_rows, dtype=np.float32)
+                    )
+                    self._refresh()
+            finally:
+                lock_handle.close()
+
+        logger.info(f"Registered {len(pending)} reference answers ({len(keys)} requested)")
+        return keys
+
+    def get_many(self, answers):
+        """
+        Return features for each answer: stored ones when registered, analyzed now otherwise
+        """
+        keys = [answer_key(answer) for answer in answers]
+
+        with self._lock:
+            self._refresh()
+            analyses = {key: self._entry(key) for key in set(keys) if key in self._entries}
+
+        missing = {}
+        for key, answer in zip(keys, answers):
+            if key in analyses or key in missing:
+                continue
+            cached = self._transient.get(key)
+            if cached is not None:
+                analyses[key] = cached
+            else:
+                missing[key] = answer
+
+        if missing:
+            for key, analysis in zip(missing, self.analyzer(list(missing.values()))):
+                self._transient.put(key, analysis)
+                analyses[key] = analysis
+
+        return [analyses[key] for key in keys]
+
+    def question_answers(self, question_id):
+        """
+        Texts of the reference answers registered for a question, in registration order
+        """
+        with self._lock:
+            self._refresh()
+            keys = self._questions.get(str(question_id), [])
+            return [self._entries[key]['text'] for key in keys if key in self._entries]
+
+    def __len__(self):
+        with self._lock:
+            self._refresh()
+            return len(self._entries)
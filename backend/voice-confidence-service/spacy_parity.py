@@ -0,0 +1,89 @@
+"""
+Compare similarity scores of a slim or smaller spaCy setup against the full en_core_web_lg pipeline.
+
+    python spacy_parity.py [--model en_core_web_md] [--mode slim] [--tolerance 0.02]
+
+Both setups score the same pairs with the same (cached) paraphrases, so the
+differences come only from spaCy. The report lists get_semantic_similarity
+and /compare scores per pair and exits with status 1 when any /compare score
+differs by more than the tolerance.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+os.environ.setdefault('WARMUP_MODELS', 'none')
+
+import app  # noqa: E402
+from onnx_parity import PAIRS, score  # noqa: E402
+from reference_store import ReferenceStore  # noqa: E402
+
+
+BASELINE_MODEL = 'en_core_web_lg'
+
+
+def use_spacy(model_name, mode, store_dir):
+    app.SPACY_MODEL_NAME = model_name
+    app.SPACY_MODE = mode
+    app.models.unload('spacy')
+    app.reference_store = ReferenceStore(
+        os.path.join(store_dir, f'{model_name}-{mode}'),
+        app.analyze_references,
+        model_version=app.reference_model_version(spacy_model=model_name)
+    )
+
+
+def semantic_similarities():
+    return [float(app.get_semantic_similarity(candidate, actuals[0])) for candidate, actuals in PAIRS]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default='en_core_web_md')
+    parser.add_argument('--mode', choices=['full', 'slim'], default='slim')
+    parser.add_argument('--tolerance', type=float, default=0.02)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as store_dir:
+        use_spacy(BASELINE_MODEL, 'full', store_dir)
+        baseline_similarity = semantic_similarities()
+        baseline_scores = score(PAIRS)
+
+        use_spacy(args.model, args.mode, store_dir)
+        candidate_similarity = semantic_similarities()
+        candidate_scores = score(PAIRS)
+
+    score_diffs = [abs(a - b) for a, b in zip(baseline_scores, candidate_scores)]
+    report = {
+        'baseline': f'{BASELINE_MODEL} (full)',
+        'candidate': f'{args.model} ({args.mode})',
+        'pairs': [
+            {
+                'candidate_answer': candidate,
+                'semantic_similarity': [round(a, 4), round(b, 4)],
+                'compare_score': [round(c, 4), round(d, 4)]
+            }
+            for (candidate, _), a, b, c, d in zip(
+                PAIRS, baseline_similarity, candidate_similarity, baseline_scores, candidate_scores
+            )
+        ],
+        'max_abs_diff_semantic_similarity': round(max(
+            abs(a - b) for a, b in zip(baseline_similarity, candidate_similarity)
+        ), 4),
+        'max_abs_diff_compare_score': round(max(score_diffs), 4),
+        'verdicts_changed': sum(
+            app.build_comparison_result(a, None)['confidence'] != app.build_comparison_result(b, None)['confidence']
+            for a, b in zip(baseline_scores, candidate_scores)
+        ),
+        'tolerance': args.tolerance
+    }
+    report['passed'] = report['max_abs_diff_compare_score'] <= args.tolerance
+
+    print(json.dumps(report, indent=2))
+    return 0 if report['passed'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,48 @@
+import logging
+import os
+import uuid
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+
+# compare_answers needs doc vectors, entities, noun chunks (parser + POS) and verb lemmas
+REQUIRED_COMPONENTS = {'tok2vec', 'tagger', 'attribute_ruler', 'lemmatizer', 'parser', 'ner'}
+
+
+def load_slim(model_name, vectors_path):
+    """
+    spaCy pipeline with only the components answer scoring uses, whose static
+    vector table is a read-only memory map shared by every worker process
+    """
+    import spacy
+
+    # senter ships disabled in the en_core_web models, exclude it so it is never built
+    nlp = spacy.load(model_name, exclude=['senter'])
+    for name in list(nlp.pipe_names):
+        if name not in REQUIRED_COMPONENTS:
+            nlp.remove_pipe(name)
+
+    if nlp.vocab.vectors.shape[0] > 0:
+        share_vectors(nlp, vectors_path)
+    return nlp
+
+
+def share_vectors(nlp, vectors_path):
+    """
+    Replace the in-process vector table with a memory map of the same data.
+    The first process to start writes the .npy file; the copy each process loaded is then freed.
+    """
+    if not os.path.exists(vectors_path):
+        os.makedirs(os.path.dirname(vectors_path) or '.', exist_ok=True)
+        tmp_path = f'{vectors_path}.{uuid.uuid4().hex}.tmp.npy'
+        np.save(tmp_path, np.ascontiguousarray(nlp.vocab.vectors.data, dtype=np.float32))
+        os.replace(tmp_path, vectors_path)
+        logger.info(f"Wrote shared spaCy vectors to {vectors_path}")
+
+    shared = np.load(vectors_path, mmap_mode='r')
+    if shared.shape != nlp.vocab.vectors.data.shape:
+        raise ValueError(f"Shared vectors in {vectors_path} do not match the loaded spaCy model")
+    nlp.vocab.vectors.data = shared
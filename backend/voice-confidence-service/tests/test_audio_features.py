@@ -0,0 +1,100 @@
+import io
+
+import librosa
+import numpy as np
+import pytest
+import soundfile as sf
+
+from audio_features import (
+    ANALYSIS_SAMPLE_RATE, extract_features, extract_features_streaming, features_from_bytes, iter_blocks
+)
+from audio_io import decode_audio
+
+
+def speech_like(seconds, sr, seed=0):
+    # Gliding harmonic tone with pauses, noise and a stretch of digital silence
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sr)) / sr
+    phase = 2 * np.pi * np.cumsum(140 + 40 * np.sin(2 * np.pi * 0.5 * t)) / sr
+    voice = sum(np.sin(k * phase) / k for k in range(1, 6))
+    envelope = (np.sin(2 * np.pi * 1.5 * t) > -0.3).astype(np.float64)
+    audio = 0.3 * voice * envelope + 0.02 * rng.standard_normal(len(t))
+    audio[:len(audio) // 5] = 0
+    return audio.astype(np.float32)
+
+
+def per_feature_reference(audio, sr):
+    """
+    The original preprocess_audio: one librosa call (and STFT) per feature
+    """
+    mfccs_mean = np.mean(librosa.feature.mfcc(y=audio, sr=sr, n_mfcc=13).T, axis=0)
+    pitches, _ = librosa.piptrack(y=audio, sr=sr)
+    pitch_mean = np.mean(pitches[pitches > 0]) if np.any(pitches) else 0
+    spectral_centroid = np.mean(librosa.feature.spectral_centroid(y=audio, sr=sr))
+    spectral_bandwidth = np.mean(librosa.feature.spectral_bandwidth(y=audio, sr=sr))
+    chroma = np.mean(librosa.feature.chroma_stft(y=audio, sr=sr))
+    features = np.hstack([mfccs_mean, pitch_mean, spectral_centroid, spectral_bandwidth, chroma])
+    return np.pad(features, (0, 19 - len(features)))
+
+
+# 13 MFCC means, pitch, centroid, bandwidth, then chroma and two zeros of padding
+CHROMA = 16
+
+
+def assert_streaming_close(features, expected):
+    assert features.shape == (19,)
+    others = np.arange(19) != CHROMA
+    np.testing.assert_allclose(features[others], expected[others], rtol=1e-5, atol=1e-5)
+    # The streaming tuning pick is approximate near ties between two bins,
+    # which moves the chroma mean by about 1e-4 relative
+    np.testing.assert_allclose(features[CHROMA], expected[CHROMA], rtol=1e-3)
+
+
+@pytest.fixture(params=[0.5, 7.3, 20.0], ids=lambda seconds: f'{seconds}s')
+def clip(request):
+    return speech_like(request.param, ANALYSIS_SAMPLE_RATE, seed=int(request.param * 10))
+
+
+def test_extract_features_matches_per_feature_calls(clip):
+    expected = per_feature_reference(clip, ANALYSIS_SAMPLE_RATE)
+    features = extract_features(clip, ANALYSIS_SAMPLE_RATE)
+    assert features.shape == (19,)
+    np.testing.assert_allclose(features, expected, rtol=1e-6, atol=1e-6)
+
+
+def test_streaming_matches_per_feature_calls(clip):
+    expected = per_feature_reference(clip, ANALYSIS_SAMPLE_RATE)
+    # An odd block size so blocks never line up with STFT frames
+    features = extract_features_streaming(iter_blocks(clip, block_size=12345), ANALYSIS_SAMPLE_RATE)
+    assert_streaming_close(features, expected)
+
+
+def test_streaming_upload_matches_decoded_upload():
+    # 44.1 kHz upload: the block reader resamples while streaming
+    buffer = io.BytesIO()
+    sf.write(buffer, speech_like(9.0, 44100), 44100, format='WAV', subtype='PCM_16')
+    data = buffer.getvalue()
+
+    audio, sr = decode_audio(data, sr=ANALYSIS_SAMPLE_RATE)
+    expected = per_feature_reference(audio, sr)
+    assert_streaming_close(features_from_bytes(data, streaming=True), expected)
+    np.testing.assert_allclose(features_from_bytes(data, streaming=False), expected, rtol=1e-6, atol=1e-6)
+
+
+@pytest.mark.parametrize('sr', [44100, 48000])
+@pytest.mark.parametrize('streaming', [False, True], ids=['full', 'stream'])
+def test_native_rate_upload_matches_original_preprocess_audio(sr, streaming):
+    # The confidence classifier was trained on librosa.load(path, sr=None) features,
+    # the service default (FEATURE_SAMPLE_RATE=native) must keep reproducing them
+    buffer = io.BytesIO()
+    sf.write(buffer, speech_like(6.0, sr, seed=sr), sr, format='WAV', subtype='PCM_16')
+    data = buffer.getvalue()
+
+    audio, native_sr = librosa.load(io.BytesIO(data), sr=None)
+    assert native_sr == sr
+    expected = per_feature_reference(audio, native_sr)
+    features = features_from_bytes(data, sr=None, streaming=streaming)
+    if streaming:
+        assert_streaming_close(features, expected)
+    else:
+        np.testing.assert_allclose(features, expected, rtol=1e-6, atol=1e-6)
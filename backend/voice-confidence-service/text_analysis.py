@@ -0,0 +1,71 @@
+import numpy as np
+
+
+class TextAnalysis:
+    """
+    Everything answer scoring needs from one text, built from a single spaCy parse.
+
+    With normalize=True the scoring text is the lowercased lemmas of the
+    non-stopword alphanumeric tokens (what preprocess_text used to produce)
+    and the spaCy vector is the average of those lemmas' vectors. Entities,
+    noun phrases and verbs are built from the same kept lemmas, like the key
+    information of the preprocessed text used to be, so determiners and case
+    do not break matches. Entity spans are still detected on the cased text.
+    Otherwise the text is scored as-is, which is how paraphrases are compared.
+    """
+
+    __slots__ = ('text', 'normalized', 'vector', 'embedding', 'entities', 'noun_phrases', 'main_verbs')
+
+    def __init__(self, text, normalized, vector, entities, noun_phrases, main_verbs, embedding=None):
+        self.text = text
+        self.normalized = normalized
+        self.vector = vector
+        self.embedding = embedding
+        self.entities = entities
+        self.noun_phrases = noun_phrases
+        self.main_verbs = main_verbs
+
+    @staticmethod
+    def keep(token):
+        return not token.is_stop and token.text.isalnum()
+
+    @classmethod
+    def normalized_span(cls, span):
+        return ' '.join(token.lemma_.lower() for token in span if cls.keep(token))
+
+    @classmethod
+    def from_doc(cls, doc, normalize=True):
+        lemmas = [token.lemma_.lower() for token in doc if cls.keep(token)]
+
+        if normalize:
+            normalized = ' '.join(lemmas)
+            if lemmas:
+                vector = np.mean([doc.vocab.get_vector(lemma) for lemma in lemmas], axis=0)
+            else:
+                vector = np.zeros(doc.vocab.vectors_length, dtype=np.float32)
+            entities = [text for text in map(cls.normalized_span, doc.ents) if text]
+            noun_phrases = [text for text in map(cls.normalized_span, doc.noun_chunks) if text]
+            main_verbs = [token.lemma_.lower() for token in doc if token.pos_ == "VERB" and cls.keep(token)]
+        else:
+            normalized = doc.text
+            vector = doc.vector
+            entities = [ent.text for ent in doc.ents]
+            noun_phrases = [chunk.text for chunk in doc.noun_chunks]
+            main_verbs = [token.lemma_ for token in doc if token.pos_ == "VERB"]
+
+        return cls(
+            text=doc.text,
+            normalized=normalized,
+            vector=vector,
+            entities=entities,
+            noun_phrases=noun_phrases,
+            main_verbs=main_verbs
+        )
+
+    @property
+    def info(self):
+        return {
+            'entities': self.entities,
+            'noun_phrases': self.noun_phrases,
+            'main_verbs': self.main_verbs
+        }
@@ -0,0 +1,228 @@
+import itertools
+import json
+import logging
+import queue
+import threading
+import time
+import urllib.parse
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class WorkersUnavailableError(Exception):
+    pass
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    # A redirect could point the callback at a host outside the allowlist
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+class TranscriptionQueue:
+    """
+    Asynchronous Whisper jobs served by a bounded pool of worker threads.
+
+    Every worker gets its own model instance from model_loader(slot), slot
+    being its index in 0..num_workers-1, so decodes never share state. The
+    model is fetched again for every job and not held in between, so a
+    loader backed by the ModelRegistry can evict and reload it. Pending jobs
+    are served shortest audio first so short answers do not wait behind long
+    recordings.
+
+    A worker whose model fails to load exits; once none is left the queued
+    jobs are failed and submissions are refused until the workers are
+    restarted, at most once every retry_after seconds.
+
+    Callbacks are only POSTed to http(s) URLs whose host is in callback_hosts
+    (none by default), without following redirects, and from their own
+    threads so a slow receiver never holds up a Whisper worker.
+    """
+
+    def __init__(self, model_loader, num_workers=2, max_pending=100, job_ttl=3600, retry_after=30,
+                 callback_hosts=(), callback_workers=2):
+        self.model_loader = model_loader
+        self.num_workers = num_workers
+        self.max_pending = max_pending
+        self.job_ttl = job_ttl
+        self.retry_after = retry_after
+        self.callback_hosts = {host.lower() for host in callback_hosts}
+        self._callbacks = ThreadPoolExecutor(max_workers=callback_workers, thread_name_prefix='transcription-callback')
+        self._opener = urllib.request.build_opener(_NoRedirect)
+        self._queue = queue.PriorityQueue()
+        self._counter = itertools.count()
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._running = 0
+        self._active = 0
+        self._slots = set()
+        self._load_error = None
+        self._failed_at = None
+
+    def _start_workers(self):
+        with self._lock:
+            if self._running >= self.num_workers:
+                return
+            if self._failed_at is not None and time.time() - self._failed_at < self.retry_after:
+                return
+            for slot in range(self.num_workers):
+                if slot in self._slots:
+                    continue
+                worker = threading.Thread(
+                    target=self._work, args=(slot,), name=f'transcription-worker-{slot}', daemon=True
+                )
+                self._slots.add(slot)
+                self._running += 1
+                worker.start()
+
+    def _load_model(self, slot):
+        try:
+            return self.model_loader(slot)
+        except Exception as e:
+            logger.error(f"Transcription worker could not load its model: {str(e)}")
+            with self._lock:
+                self._slots.discard(slot)
+                self._running -= 1
+                self._load_error = str(e)
+                self._failed_at = time.time()
+                orphaned = self._drain() if self._running == 0 else []
+            for job in orphaned:
+                self._notify(job)
+            return None
+
+    def _drain(self):
+        # Fail every queued job, no worker is left to run them
+        orphaned = []
+        while True:
+            try:
+                _, _, job_id, _ = self._queue.get_nowait()
+            except queue.Empty:
+                return orphaned
+            job = self._jobs.get(job_id)
+            if job is None:
+                continue
+            job['error'] = f"Transcription model unavailable: {self._load_error}"
+            job['status'] = 'failed'
+            job['finished_at'] = time.time()
+            orphaned.append(job)
+
+    def _work(self, slot):
+        if self._load_model(slot) is None:
+            return
+        with self._lock:
+            self._load_error = self._failed_at = None
+
+        while True:
+            _, _, job_id, audio = self._queue.get()
+            job = self._jobs.get(job_id)
+            if job is None:
+                continue
+
+            job['status'] = 'running'
+            job['started_at'] = time.time()
+            with self._lock:
+                self._active += 1
+            try:
+                result = self.model_loader(slot).transcribe(audio, fp16=False)
+                job['result'] = {
+                    'success': True,
+                    'candidate_answer': result['text']
+                }
+                job['status'] = 'completed'
+            except Exception as e:
+                logger.error(f"Transcription job {job_id} failed: {str(e)}")
+                job['error'] = str(e)
+                job['status'] = 'failed'
+            finally:
+                with self._lock:
+                    self._active -= 1
+            job['finished_at'] = time.time()
+            self._notify(job)
+
+    def check_callback_url(self, url):
+        """
+        Raise ValueError unless url is an http(s) URL on an allowed callback host
+        """
+        parsed = urllib.parse.urlsplit(url)
+        if parsed.scheme not in ('http', 'https') or not parsed.hostname:
+            raise ValueError("callback_url must be an http or https URL")
+        if parsed.hostname.lower() not in self.callback_hosts:
+            raise ValueError(f"callback_url host '{parsed.hostname}' is not allowed")
+
+    def _notify(self, job):
+        if job.get('callback_url'):
+            self._callbacks.submit(self._send_callback, job)
+
+    def _send_callback(self, job):
+        body = json.dumps(self.public_view(job)).encode('utf-8')
+        req = urllib.request.Request(
+            job['callback_url'],
+            data=body,
+            headers={'Content-Type': 'application/json'},
+            method='POST'
+        )
+        try:
+            self._opener.open(req, timeout=10).close()
+        except Exception as e:
+            logger.error(f"Callback for job {job['job_id']} failed: {str(e)}")
+
+    def _evict_finished(self):
+        cutoff = time.time() - self.job_ttl
+        for job_id, job in list(self._jobs.items()):
+            if job.get('finished_at') and job['finished_at'] < cutoff:
+                self._jobs.pop(job_id, None)
+
+    def submit(self, audio, duration, callback_url=None):
+        """
+        Queue 16 kHz audio for transcription and return its job id
+        """
+        if callback_url:
+            self.check_callback_url(callback_url)
+        self._start_workers()
+        with self._lock:
+            self._evict_finished()
+            if self._running == 0:
+                raise WorkersUnavailableError(
+                    f"No transcription worker is running ({self._load_error}), retry later"
+                )
+            if self._queue.qsize() >= self.max_pending:
+                raise QueueFullError("Transcription queue is full, retry later")
+
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {
+                'job_id': job_id,
+                'status': 'queued',
+                'duration': duration,
+                'callback_url': callback_url,
+                'created_at': time.time()
+            }
+            self._queue.put((duration, next(self._counter), job_id, audio))
+        return job_id
+
+    def get(self, job_id):
+        job = self._jobs.get(job_id)
+        return self.public_view(job) if job else None
+
+    def depth(self):
+        """
+        Jobs waiting for a worker
+        """
+        return self._queue.qsize()
+
+    def active(self):
+        """
+        Jobs a worker is transcribing right now
+        """
+        return self._active
+
+    @staticmethod
+    def public_view(job):
+        return {key: value for key, value in job.items() if key != 'callback_url'}
@@ -0,0 +1,75 @@
+import threading
+from contextlib import contextmanager
+
+
+# Client hints besides an explicit tier name
+FASTEST = 'fast'
+MOST_ACCURATE = 'accurate'
+
+
+class WhisperTierPolicy:
+    """
+    Picks the Whisper model size for one request from the current load, the
+    recording length and an optional client hint.
+
+    Tiers are ordered fastest first. With spare capacity requests get the most
+    accurate tier; at busy_depth outstanding transcriptions they drop one tier
+    and at peak_depth they all get the fastest. Recordings longer than
+    long_seconds drop one more tier since decode time grows with length.
+    A hint can ask for a faster tier but never for one the load does not allow.
+    """
+
+    def __init__(self, tiers, busy_depth=2, peak_depth=6, long_seconds=120):
+        if not tiers:
+            raise ValueError("At least one Whisper tier is required")
+        self.tiers = list(tiers)
+        self.busy_depth = busy_depth
+        self.peak_depth = peak_depth
+        self.long_seconds = long_seconds
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def in_flight(self):
+        return self._in_flight
+
+    @contextmanager
+    def track(self):
+        """
+        Count a synchronous transcription as outstanding while it runs
+        """
+        with self._lock:
+            self._in_flight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def max_tier_index(self, depth, duration):
+        index = len(self.tiers) - 1
+        if depth >= self.peak_depth:
+            return 0
+        if depth >= self.busy_depth:
+            index -= 1
+        if duration > self.long_seconds:
+            index -= 1
+        return max(index, 0)
+
+    def choose(self, depth, duration, hint=None):
+        """
+        Tier name for a recording of duration seconds with depth transcriptions outstanding
+        """
+        allowed = self.max_tier_index(depth, duration)
+        if not hint or hint == MOST_ACCURATE:
+            return self.tiers[allowed]
+        if hint == FASTEST:
+            return self.tiers[0]
+        if hint not in self.tiers:
+            raise ValueError(f"Unknown Whisper tier '{hint}', expected one of {', '.join(self.tiers)}")
+        return self.tiers[min(self.tiers.index(hint), allowed)]
+
+    def at_least(self, tier):
+        """
+        The given tier and every more accurate one, most accurate first
+        """
+        return self.tiers[self.tiers.index(tier):][::-1]